@@ -1,16 +1,43 @@
-from flask import Flask, request, render_template
+from flask import Flask, request, render_template, jsonify, g, Response
 import os
 import sys
+import time
 
 src_path = os.path.join(os.path.dirname(__file__), 'src')
 sys.path.insert(0, src_path)
 
-from mlengine.models.predict import Prediction, CustomData
+from mlengine.common.exceptions import InvalidInputException, UnknownCategoryException
+from mlengine.common.metrics import Info, registry, record_request, stage_timer
+from mlengine.config.settings import settings
+from mlengine.models.predict import Prediction, CustomData, CustomDataBatch
+from mlengine.models.batching import PredictionBatcher
 
 application = Flask(__name__)
 
 app = application
 
+prediction = Prediction()
+
+if settings.prediction.micro_batching.enabled:
+    single_prediction = PredictionBatcher(prediction,
+                                          max_wait_ms=settings.prediction.micro_batching.max_wait_ms,
+                                          max_batch_size=settings.prediction.micro_batching.max_batch_size).start()
+else:
+    single_prediction = prediction
+
+registry.register(Info('model_info', 'Version of the served model.', lambda: {'version': prediction.model_version or ''}))
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    record_request(request.endpoint or 'unknown', response.status_code, time.perf_counter() - g.request_start)
+    return response
+
 
 @app.route('/')
 def index():
@@ -22,21 +49,46 @@ def predict():
     if request.method == 'GET':
         return render_template(('prediction.html'))
     else:
-        data = CustomData(
-            gender=request.form.get('gender'),
-            race_ethnicity=request.form.get('race_ethnicity'),
-            parental_level_of_education=request.form.get('parental_level_of_education'),
-            lunch=request.form.get('lunch'),
-            test_preparation_course=request.form.get('test_preparation_course'),
-            reading_score=int(request.form.get('reading_score')),
-            writing_score=int(request.form.get('writing_score')),
-        )
-
-        pred_df = data.get_data_as_data_frame()
-        prediction = Prediction()
-        results = prediction.predict(pred_df)
-
-        return render_template('prediction.html', results=results[0])
+        with stage_timer('form_parsing'):
+            form = request.form
+        with stage_timer('custom_data'):
+            data = CustomData.from_form(form)
+
+        with stage_timer('dataframe'):
+            pred_df = data.get_data_as_data_frame()
+        results = single_prediction.predict(pred_df)
+
+        with stage_timer('template_rendering'):
+            return render_template('prediction.html', results=results[0])
+
+
+@app.route('/health')
+def health():
+    return jsonify(status='ok', model_version=prediction.model_version)
+
+
+@app.route('/metrics')
+def metrics():
+    return Response(registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    try:
+        if request.mimetype == 'text/csv':
+            batch = CustomDataBatch.from_csv(request.get_data(as_text=True))
+        else:
+            batch = CustomDataBatch.from_payload(request.get_json(silent=True))
+    except InvalidInputException as e:
+        status = 413 if e.id == 'PRD_EX_003' else 400
+        return jsonify(error=e.id, message=e.message), status
+
+    try:
+        results = prediction.predict(batch.get_data_as_data_frame())
+    except UnknownCategoryException as e:
+        return jsonify(error=e.id, message=e.message), 400
+
+    return jsonify(predictions=results.tolist(), model_version=prediction.model_version)
 
 
 if __name__ == "__main__":
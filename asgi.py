@@ -0,0 +1,154 @@
+"""
+Async (ASGI) serving entry point exposing the same routes as application.py, e.g.: uvicorn asgi:app --host 0.0.0.0 --port 8080
+
+CPU-bound scoring runs in a bounded thread or process pool (serving settings), so the event loop stays free
+to answer health checks and handle I/O of other requests while models are busy.
+"""
+from quart import Quart, request, render_template, jsonify, g, Response
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import os
+import sys
+import time
+
+src_path = os.path.join(os.path.dirname(__file__), 'src')
+sys.path.insert(0, src_path)
+
+from mlengine.common.exceptions import InvalidInputException, UnknownCategoryException
+from mlengine.common.metrics import Info, registry, record_request
+from mlengine.config.settings import settings
+from mlengine.models.predict import Prediction, CustomData, CustomDataBatch
+from mlengine.models.batching import PredictionBatcher
+
+application = Quart(__name__)
+
+app = application
+
+prediction = Prediction()
+
+def load_model():
+    return prediction.model_holder.get().version
+
+
+if settings.serving.executor == 'process':
+    # every worker process loads the artifacts when it starts, before it scores its first request
+    executor = ProcessPoolExecutor(max_workers=settings.serving.workers, initializer=load_model)
+else:
+    executor = ThreadPoolExecutor(max_workers=settings.serving.workers, thread_name_prefix='scoring')
+
+batcher = None
+if settings.prediction.micro_batching.enabled:
+    batcher = PredictionBatcher(prediction,
+                                max_wait_ms=settings.prediction.micro_batching.max_wait_ms,
+                                max_batch_size=settings.prediction.micro_batching.max_batch_size).start()
+
+pending = asyncio.Semaphore(settings.serving.max_pending)
+
+served_model_version = None  # with a process pool the model lives in worker processes, so the version is tracked here
+
+registry.register(Info('model_info', 'Version of the served model.', lambda: {'version': served_model_version or ''}))
+
+
+def run_prediction(features):
+    # module-level function, so it can also be sent to a process pool (each worker process holds its own model)
+    return prediction.predict(features), prediction.model_version
+
+
+async def score(features, coalesce: bool = False):
+    """
+    Scores features off the event loop.
+
+    :param features: DataFrame with records to score.
+    :param coalesce: if True and micro-batching is enabled, request is scored together with concurrent ones.
+    :return: tuple of predictions and version of the model that produced them.
+    """
+    global served_model_version
+
+    async with pending:
+        if coalesce and batcher is not None:
+            results, model_version = await asyncio.wrap_future(batcher.submit(features)), prediction.model_version
+        else:
+            results, model_version = await asyncio.get_running_loop().run_in_executor(executor, run_prediction, features)
+    served_model_version = model_version
+    return results, model_version
+
+
+@app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+async def record_request_metrics(response):
+    record_request(request.endpoint or 'unknown', response.status_code, time.perf_counter() - g.request_start)
+    return response
+
+
+@app.route('/')
+async def index():
+    return await render_template('index.html')
+
+
+@app.route('/predict', methods=['GET', 'POST'])
+async def predict():
+    if request.method == 'GET':
+        return await render_template('prediction.html')
+    else:
+        data = CustomData.from_form(await request.form)
+
+        pred_df = data.get_data_as_data_frame()
+        results, _ = await score(pred_df, coalesce=True)
+
+        return await render_template('prediction.html', results=results[0])
+
+
+@app.route('/health')
+async def health():
+    return jsonify(status='ok', model_version=served_model_version)
+
+
+@app.route('/metrics')
+async def metrics():
+    # with a process pool, prediction stage timings are recorded in (and not visible from) the worker processes,
+    # see the help text of prediction_stage_seconds
+    return Response(registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/predict_batch', methods=['POST'])
+async def predict_batch():
+    try:
+        if request.mimetype == 'text/csv':
+            batch = CustomDataBatch.from_csv(await request.get_data(as_text=True))
+        else:
+            batch = CustomDataBatch.from_payload(await request.get_json(silent=True))
+    except InvalidInputException as e:
+        status = 413 if e.id == 'PRD_EX_003' else 400
+        return jsonify(error=e.id, message=e.message), status
+
+    try:
+        results, model_version = await score(batch.get_data_as_data_frame())
+    except UnknownCategoryException as e:
+        return jsonify(error=e.id, message=e.message), 400
+
+    return jsonify(predictions=results.tolist(), model_version=model_version)
+
+
+@app.before_serving
+async def warm_up():
+    # artifacts are loaded before the first request arrives, so it does not pay the unpickling cost; one task is
+    # submitted per worker, so that a process pool starts all of its workers (each loading the artifacts) upfront
+    global served_model_version
+    loop = asyncio.get_running_loop()
+    versions = await asyncio.gather(*(loop.run_in_executor(executor, load_model) for _ in range(settings.serving.workers)))
+    served_model_version = versions[0]
+
+
+@app.after_serving
+async def shutdown():
+    if batcher is not None:
+        batcher.stop()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=8080)
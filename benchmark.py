@@ -0,0 +1,286 @@
+"""
+Latency and throughput benchmark of the serving path.
+
+Replays recorded (JSONL file with one CustomData record per line) or synthetic requests against the in-process
+predictor or a prediction server, and reports p50/p95/p99 latency, throughput and a per-stage breakdown, including the
+stages recorded within Prediction.predict (linear table scorer, or transform and predict) and prediction cache hits.
+Results are saved as JSON, so runs can be compared between commits, e.g.:
+
+    python benchmark.py --mode in-process --concurrency 8 --output bench/after.json --compare bench/before.json
+    python benchmark.py --mode server --server flask --concurrency 16
+    python benchmark.py --mode import --import-budget 1.5
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from datetime import datetime
+
+import numpy as np
+
+src_path = os.path.join(os.path.dirname(__file__), 'src')
+sys.path.insert(0, src_path)
+
+from mlengine.common.metrics import registry
+from mlengine.models.predict import Prediction, CustomData
+
+STAGES = ['validation', 'dataframe', 'prediction']
+
+
+def load_requests(path: str | None, num_requests: int, seed: int) -> list:
+    """
+    Loads recorded requests or generates synthetic ones from categories known to the fitted preprocessing pipeline.
+
+    :param path: JSONL file with one record (dict of CustomData fields) per line, None to generate synthetic requests.
+    :param num_requests: number of requests to return (recorded requests are cycled if there are fewer).
+    :param seed: seed of the synthetic request generator.
+    :return: list of records with string values, as submitted by the prediction form.
+    """
+    if path is not None:
+        names = {field.name for field in fields(CustomData)}
+        with open(path) as file:
+            records = [record for record in map(json.loads, filter(str.strip, file)) if isinstance(record, dict) and names <= set(record)]
+        if not records:
+            raise ValueError(f'No CustomData records found in {path}.')
+    else:
+        from mlengine.features.compiled import CompiledPreprocessor
+
+        compiled = CompiledPreprocessor.from_pipeline(Prediction().model_holder.get().preprocessor)
+        rng = random.Random(seed)
+        records = [{**{name: rng.choice(list(table)) for name, table in zip(compiled.cat_features, compiled.cat_tables)},
+                    **{name: rng.randint(0, 100) for name in compiled.num_features}} for _ in range(num_requests)]
+
+    records = [{name: str(value) for name, value in record.items()} for record in records]
+    return [records[i % len(records)] for i in range(num_requests)]
+
+
+def run_concurrently(func, requests: list, concurrency: int) -> tuple:
+    """
+    Calls func for every request from a pool of threads.
+
+    :return: tuple of list of func results (None for failed calls), number of errors and wall time in seconds.
+    """
+    errors = 0
+    lock = threading.Lock()
+
+    def call(request):
+        nonlocal errors
+        try:
+            return func(request)
+        except Exception:
+            with lock:
+                errors += 1
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, requests))
+    return results, errors, time.perf_counter() - start
+
+
+def summarize(latencies: list) -> dict:
+    latencies = np.asarray(latencies) * 1000
+    if not len(latencies):
+        return {}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "mean_ms": latencies.mean(), "max_ms": latencies.max()}
+
+
+def get_stage_totals() -> tuple:
+    """
+    Returns totals recorded by Prediction.predict in the process-wide metrics registry.
+
+    :return: tuple of dict of (count, seconds) per stage (artifact loading, linear table scorer, transform, predict)
+    and dict of prediction cache hits and misses.
+    """
+    stages, cache = {}, {}
+    for key, metric in registry.snapshot().items():
+        match = re.fullmatch(r'prediction_stage_seconds\{stage="(\w+)"\}', key)
+        if match is not None:
+            stages[match.group(1)] = (metric["count"], metric["sum"])
+        elif key in ('prediction_cache_hits_total', 'prediction_cache_misses_total'):
+            cache[key.removeprefix('prediction_cache_').removesuffix('_total')] = metric
+    return stages, cache
+
+
+def bench_in_process(requests: list, concurrency: int) -> dict:
+    prediction = Prediction()
+    prediction.model_holder.get()  # artifacts are loaded before measuring
+
+    def served(record):
+        timings = {}
+        start = time.perf_counter()
+        data = CustomData.from_form(record)
+        timings['validation'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pred_df = data.get_data_as_data_frame()
+        timings['dataframe'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prediction.predict(pred_df)
+        timings['prediction'] = time.perf_counter() - start
+        return timings
+
+    stages_before, cache_before = get_stage_totals()
+    results, errors, wall_time = run_concurrently(served, requests, concurrency)
+    stages_after, cache_after = get_stage_totals()
+    results = [result for result in results if result is not None]
+
+    # stages within Prediction.predict are recorded as totals only, so their mean per call is reported
+    breakdown = {}
+    for stage, (count, seconds) in stages_after.items():
+        count, seconds = count - stages_before.get(stage, (0, 0.0))[0], seconds - stages_before.get(stage, (0, 0.0))[1]
+        if count:
+            breakdown[stage] = {"calls": count, "mean_ms": seconds / count * 1000, "total_ms": seconds * 1000}
+
+    return {
+        "latency": summarize([sum(result.values()) for result in results]),
+        "throughput_rps": len(results) / wall_time,
+        "errors": errors,
+        "stages": {stage: summarize([result[stage] for result in results]) for stage in STAGES},
+        "prediction_stages": breakdown,
+        "prediction_cache": {key: value - cache_before.get(key, 0) for key, value in cache_after.items()},
+        "model_version": prediction.model_version,
+    }
+
+
+def start_server(server: str, port: int):
+    """
+    Starts application.py (flask) or asgi.py (asgi) app in a background thread.
+
+    :return: callable stopping the server.
+    """
+    if server == 'flask':
+        from werkzeug.serving import make_server
+        from application import app
+
+        httpd = make_server('127.0.0.1', port, app, threaded=True)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        return httpd.shutdown
+
+    import uvicorn
+    from asgi import app
+
+    uvicorn_server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    while not uvicorn_server.started:
+        time.sleep(0.05)
+
+    def stop():
+        uvicorn_server.should_exit = True
+        thread.join()
+
+    return stop
+
+
+def bench_server(requests: list, concurrency: int, url: str) -> dict:
+    def send(record):
+        body = urllib.parse.urlencode(record).encode()
+        start = time.perf_counter()
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, method='POST')) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    send(requests[0])  # warm-up: artifacts are loaded on the first request
+    latencies, errors, wall_time = run_concurrently(send, requests, concurrency)
+    latencies = [latency for latency in latencies if latency is not None]
+    return {"latency": summarize(latencies), "throughput_rps": len(latencies) / wall_time, "errors": errors}
+
+
+def bench_import(module: str = 'mlengine.models.predict', repeats: int = 3) -> dict:
+    """
+    Measures cold import time of the serving path in fresh interpreters (best of repeats).
+    """
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src_path, os.environ.get("PYTHONPATH")]))}
+    times = [float(subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=env).stdout.split()[-1])
+             for _ in range(repeats)]
+    return {"module": module, "import_s": min(times)}
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> None:
+    def walk(current, previous, prefix=''):
+        for key, value in current.items():
+            if isinstance(value, dict) and isinstance(previous.get(key), dict):
+                walk(value, previous[key], f'{prefix}{key}.')
+            elif isinstance(value, (int, float)) and isinstance(previous.get(key), (int, float)) and previous[key]:
+                print(f'{prefix}{key}: {previous[key]:.4f} -> {value:.4f} ({(value / previous[key] - 1) * 100:+.1f}%)')
+
+    print(f"Comparison against {baseline.get('commit')}:")
+    walk(results, baseline.get("results", {}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['in-process', 'server', 'import'], default='in-process')
+    parser.add_argument('--requests', default=None, help='JSONL file with recorded requests, synthetic requests are used if omitted')
+    parser.add_argument('--num-requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask', help='app started locally in server mode')
+    parser.add_argument('--url', default=None, help='benchmark an already running server instead of starting one')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--import-budget', type=float, default=None, help='fail if the serving path imports slower (seconds)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='path of the JSON file to save results to')
+    parser.add_argument('--compare', default=None, help='JSON results of a previous run to compare against')
+    args = parser.parse_args()
+
+    if args.mode == 'import':
+        results = bench_import()
+    else:
+        requests = load_requests(args.requests, args.num_requests, args.seed)
+        if args.mode == 'in-process':
+            results = bench_in_process(requests, args.concurrency)
+        elif args.url is not None:
+            results = bench_server(requests, args.concurrency, args.url)
+        else:
+            stop = start_server(args.server, args.port)
+            try:
+                results = bench_server(requests, args.concurrency, f'http://127.0.0.1:{args.port}/predict')
+            finally:
+                stop()
+
+    report = {
+        "commit": get_commit(),
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        "results": results,
+    }
+    print(json.dumps(report, indent=4, default=float))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4, default=float)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+    if args.import_budget is not None and args.mode == 'import' and results["import_s"] > args.import_budget:
+        print(f'Import of {results["module"]} took {results["import_s"]:.3f} s, over the budget of {args.import_budget:.3f} s.')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
-from mlengine.pipelines.pipeline import run_pipeline
+import argparse
+
+from mlengine.pipelines.pipeline import run_pipelines
 
 
 def main():
-    run_pipeline(option='data_ingestion')
-    run_pipeline(option='data_validation_pre_t')
-    run_pipeline(option='data_transformation')
-    run_pipeline(option='data_validation_post_t')
-    run_pipeline(option='data_split')
-    run_pipeline(option='model_preprocessing')
-    run_pipeline(option='model_training')
-    run_pipeline(option='model_validation')
-    run_pipeline(option='model_testing')
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='run all pipelines, even if their outputs are up to date')
+    args = parser.parse_args()
+
+    run_pipelines(options=[
+        'data_ingestion',
+        'data_validation_pre_t',
+        'data_transformation',
+        'data_validation_post_t',
+        'data_split',
+        'model_preprocessing',
+        'model_training',
+        'model_validation',
+        'model_testing',
+    ], force=args.force)
 
 
 if __name__ == "__main__":
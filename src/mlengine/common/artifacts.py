@@ -0,0 +1,165 @@
+import os
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+
+from mlengine.common.logger import logger
+
+
+class ArtifactStore:
+    """
+    Run-scoped store of artifacts (data frames, fitted pipelines, models) keyed by their file path.
+    While a run is active, a saved artifact is kept in memory for the stages consuming it and written to disk
+    in the background, and a loaded one is read from disk only once. Outside of a run, artifacts are written
+    and read directly, so a single stage can still be run on its own.
+    """
+
+    def __init__(self):
+        self._objects = {}
+        self._pending = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def active(self) -> bool:
+        return self._executor is not None
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return os.path.normpath(os.path.abspath(path))
+
+    @contextmanager
+    def run(self, max_workers: int = 2):
+        """
+        Activates the store for the duration of a run. On exit, waits for all pending writes and drops the artifacts.
+
+        :param max_workers: number of threads writing artifacts to disk.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='artifact-writer')
+        try:
+            yield self
+        finally:
+            try:
+                self.wait()
+            finally:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                with self._lock:
+                    self._objects.clear()
+                    self._pending.clear()
+                    self._loading.clear()
+
+    def save(self, obj, path: Path, writer: typing.Callable, keep: bool = True) -> None:
+        """
+        Saves artifact, in the background if the store is active.
+
+        :param obj: artifact to be saved.
+        :param path: destination path of the artifact.
+        :param writer: callable writing the artifact to disk, called with obj and path.
+        :param keep: whether the artifact is kept in memory for the rest of the run, or only until it is written.
+        """
+        if not self.active:
+            writer(obj, path)
+            return
+
+        key = self._key(path)
+        with self._lock:
+            self._objects[key] = obj
+            previous = self._pending.get(key)
+            self._pending[key] = self._executor.submit(self._write, previous, obj, path, writer, None if keep else key)
+
+    def _write(self, previous, obj, path: Path, writer: typing.Callable, drop_key: str | None) -> None:
+        if previous is not None:
+            wait([previous])  # writes of the same path are applied in order
+        writer(obj, path)
+        logger.info(f"Artifact written to: {path}")
+        if drop_key is not None:
+            with self._lock:
+                if self._objects.get(drop_key) is obj:
+                    del self._objects[drop_key]
+
+    def load(self, path: Path, loader: typing.Callable, keep: bool = True):
+        """
+        Returns artifact kept in memory, or loads it (once per run if the store is active and keep is set).
+
+        :param path: path of the artifact.
+        :param loader: callable reading the artifact from disk, called with path.
+        :param keep: whether a loaded artifact is kept in memory for the rest of the run.
+        """
+        if not self.active:
+            return loader(path)
+
+        key = self._key(path)
+        with self._lock:
+            if key in self._objects:
+                return self._objects[key]  # artifacts saved without keep are in memory until they are written
+            if not keep:
+                return loader(path)
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._objects:
+                    return self._objects[key]
+            obj = loader(path)
+            with self._lock:
+                self._objects[key] = obj
+        return obj
+
+    def holds(self, path: Path) -> bool:
+        """
+        Returns True if artifact is kept in memory.
+        """
+        with self._lock:
+            return self._key(path) in self._objects
+
+    def exists(self, path: Path) -> bool:
+        """
+        Returns True if artifact exists on disk or is pending to be written to it.
+        """
+        with self._lock:
+            return self._key(path) in self._pending or os.path.exists(path)
+
+    def _futures(self, paths: list | None) -> list:
+        with self._lock:
+            if paths is None:
+                return list(self._pending.values())
+            prefixes = [self._key(path) for path in paths]
+            return [future for key, future in self._pending.items()
+                    if any(key == prefix or key.startswith(prefix + os.sep) for prefix in prefixes)]
+
+    def wait(self, paths: list | None = None) -> None:
+        """
+        Waits until pending writes of given files (or files in given directories) are on disk.
+
+        :param paths: list of file or directory paths, None to wait for all pending writes.
+        :raises Exception: first error raised by any of the awaited writes.
+        """
+        for future in self._futures(paths):
+            future.result()
+
+    def on_written(self, paths: list, callback: typing.Callable) -> None:
+        """
+        Calls callback once pending writes of given paths succeed (immediately if there are none).
+
+        :param paths: list of file or directory paths.
+        :param callback: callable without arguments.
+        """
+        futures = self._futures(paths) if self.active else []
+        if not futures:
+            callback()
+            return
+
+        def call():
+            done, _ = wait(futures)
+            if all(future.exception() is None for future in done):
+                callback()
+
+        with self._lock:
+            self._executor.submit(call)
+
+
+artifact_store = ArtifactStore()
@@ -26,6 +26,32 @@ class MissingCriticalFileException(GenericException):
     pass
 
 
+class InvalidInputException(GenericException):
+    pass
+
+
+class UnknownCategoryException(InvalidInputException, ValueError):
+    """
+    Categorical value not seen during fitting, raised by scoring. It is a ValueError as well, as OneHotEncoder raises.
+    """
+
+    def __reduce__(self):
+        # pickled with its arguments, so that it can be raised in a worker process and re-raised in the server
+        return type(self), (self.id, self.message)
+
+
+class PipelineFailedException(GenericException):
+    pass
+
+
+class DataValidationException(GenericException):
+    pass
+
+
+class DataIngestionException(GenericException):
+    pass
+
+
 class DetailedGenericException(GenericException):
     def __init__(self, id: int | str, message: str, error_detail: sys, *args, **kwargs):
         # todo: if e hasattr id or message -> get them from e into new exception
@@ -1,12 +1,8 @@
 import logging
-import coloredlogs
 import os
+import threading
 from datetime import datetime
 
-LOG_FILE = f'{datetime.now().strftime("%m_%d_%Y_%H_%M_%S")}.log'
-LOG_PATH = os.path.join(os.getcwd(), 'logs')
-os.makedirs(LOG_PATH, exist_ok=True)
-LOG_FILE_PATH = os.path.join(LOG_PATH, LOG_FILE)
 LOG_FORMAT = '[ %(asctime)s ] [%(lineno)d] [%(name)s] - %(levelname)s - %(message)s'
 
 
@@ -21,13 +17,17 @@ class Singleton(type):
 
 class Logger(metaclass=Singleton):
     def __init__(self):
-        pass
+        self.log_file = f'{datetime.now().strftime("%m_%d_%Y_%H_%M_%S")}.log'
+        self.log_path = os.path.join(os.getcwd(), 'logs')
+        self.log_file_path = os.path.join(self.log_path, self.log_file)
 
-    @staticmethod
-    def initialize_logging():
+    def initialize_logging(self):
         if not logging.root.handlers:
+            import coloredlogs
+
+            os.makedirs(self.log_path, exist_ok=True)
             formatter = logging.Formatter(LOG_FORMAT)
-            logger = logging.getLogger(LOG_FILE)
+            logger = logging.getLogger(self.log_file)
 
             logger.setLevel(logging.DEBUG)
 
@@ -36,7 +36,7 @@ class Logger(metaclass=Singleton):
             ch.setFormatter(formatter)
             logger.addHandler(ch)
 
-            fh = logging.FileHandler(LOG_FILE_PATH)
+            fh = logging.FileHandler(self.log_file_path)
             fh.setLevel(logging.DEBUG)
             formatter = logging.Formatter(LOG_FORMAT)
             fh.setFormatter(formatter)
@@ -54,7 +54,25 @@ class Logger(metaclass=Singleton):
 
             logger.info(f"Logging initialized.\n{30 * '*'}")
 
-        return logging.getLogger(LOG_FILE)
+        return logging.getLogger(self.log_file)
+
+
+class LazyLogger:
+    """
+    Proxy of the application logger, which sets up handlers (and creates the log directory and file)
+    on first use instead of as a side effect of importing this module.
+    """
+
+    def __init__(self):
+        self._logger = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    self._logger = Logger().initialize_logging()
+        return getattr(self._logger, name)
 
 
-logger = Logger().initialize_logging()
+logger = LazyLogger()
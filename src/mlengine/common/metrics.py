@@ -0,0 +1,213 @@
+import bisect
+import threading
+import time
+import typing
+
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+
+def format_labels(labels: dict | None) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Counter:
+    """
+    Thread-safe monotonically increasing counter.
+    """
+    type = 'counter'
+
+    def __init__(self, name: str, description: str, labels: dict | None = None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int | float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int | float:
+        return self._value
+
+    def snapshot(self) -> int | float:
+        return self._value
+
+    def samples(self) -> list:
+        return [(self.name, self.labels, self._value)]
+
+
+class Info:
+    """
+    Metric with a constant value of 1 whose labels (e.g. model version) are read from a callback at collection time.
+    """
+    type = 'gauge'
+
+    def __init__(self, name: str, description: str, callback: typing.Callable[[], dict]):
+        self.name = name
+        self.description = description
+        self.labels = {}
+        self.callback = callback
+
+    def snapshot(self) -> dict:
+        return self.callback()
+
+    def samples(self) -> list:
+        return [(self.name, self.callback(), 1)]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: 'Histogram'):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed (cumulative, Prometheus-like) buckets.
+    Observing a value costs one binary search and a few increments under a lock.
+    """
+    type = 'histogram'
+
+    def __init__(self, name: str, description: str, buckets: typing.Sequence[float], labels: dict | None = None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot counts values above the highest bucket (+Inf)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> _Timer:
+        """
+        Returns context manager observing the time spent in its block (in seconds).
+        """
+        return _Timer(self)
+
+    def snapshot(self) -> dict:
+        """
+        Returns current state of the histogram.
+
+        :return: dict with cumulative counts per bucket upper bound, sum and count of observed values.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + [float('inf')], counts):
+            running += bucket_count
+            cumulative[bound] = running
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+    def samples(self) -> list:
+        snapshot = self.snapshot()
+        samples = [(f'{self.name}_bucket', {**self.labels, 'le': '+Inf' if bound == float('inf') else repr(float(bound))}, count)
+                   for bound, count in snapshot['buckets'].items()]
+        samples.append((f'{self.name}_sum', self.labels, snapshot['sum']))
+        samples.append((f'{self.name}_count', self.labels, snapshot['count']))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of metrics, looked up by name and labels.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict | None) -> tuple:
+        return name, tuple(sorted((labels or {}).items()))
+
+    def register(self, metric):
+        """
+        Registers metric, unless a metric with the same name and labels already exists.
+
+        :return: registered metric (the already existing one, if any).
+        """
+        with self._lock:
+            return self._metrics.setdefault(self._key(metric.name, metric.labels), metric)
+
+    def get(self, name: str, labels: dict | None = None):
+        return self._metrics.get(self._key(name, labels))
+
+    def snapshot(self) -> dict:
+        return {name + format_labels(dict(labels)): metric.snapshot() for (name, labels), metric in list(self._metrics.items())}
+
+    def render_prometheus(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        families = {}
+        for metric in list(self._metrics.values()):
+            families.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name, metrics in families.items():
+            lines.append(f'# HELP {name} {metrics[0].description}')
+            lines.append(f'# TYPE {name} {metrics[0].type}')
+            for metric in metrics:
+                lines += [f'{sample}{format_labels(labels)} {value}' for sample, labels, value in metric.samples()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def counter(name: str, description: str, labels: dict | None = None) -> Counter:
+    """
+    Returns counter with given name and labels, registering it on first use.
+    """
+    metric = registry.get(name, labels)
+    return metric if metric is not None else registry.register(Counter(name, description, labels))
+
+
+def histogram(name: str, description: str, buckets: typing.Sequence[float] = LATENCY_BUCKETS, labels: dict | None = None) -> Histogram:
+    """
+    Returns histogram with given name and labels, registering it on first use.
+    """
+    metric = registry.get(name, labels)
+    return metric if metric is not None else registry.register(Histogram(name, description, buckets, labels))
+
+
+def stage_timer(stage: str) -> _Timer:
+    """
+    Returns context manager recording time spent in a stage of serving a prediction.
+    """
+    return histogram('prediction_stage_seconds', 'Time spent in a stage of serving a prediction. Recorded only where predictions '
+                     'are scored in the serving process, not by worker processes of serving.executor=process.',
+                     labels={'stage': stage}).time()
+
+
+def record_request(endpoint: str, status_code: int, duration: float) -> None:
+    """
+    Records count, errors (4xx and 5xx responses) and latency of a handled HTTP request.
+    """
+    labels = {'endpoint': endpoint}
+    counter('http_requests_total', 'HTTP requests handled.', labels).inc()
+    if status_code >= 400:
+        counter('http_request_errors_total', 'HTTP requests that ended with an error status.', {**labels, 'status': status_code}).inc()
+    histogram('http_request_duration_seconds', 'Time spent handling an HTTP request.', labels=labels).observe(duration)
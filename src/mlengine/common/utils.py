@@ -1,13 +1,21 @@
+import hashlib
+import numpy as np
 import os
+import tempfile
+import typing
 import yaml
 from box import ConfigBox
 from box.exceptions import BoxValueError
 from ensure import ensure_annotations
 from pathlib import Path
-from functools import reduce
+from functools import partial, reduce
+from math import ceil, floor, log
 
+from mlengine.common.artifacts import artifact_store
 from mlengine.common.logger import logger
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
 
 @ensure_annotations
 def read_yaml(path_to_yaml: Path) -> ConfigBox:
@@ -56,15 +64,192 @@ def get_size(path: Path) -> str:
     return f"~ {size_in_kb} KB"
 
 
-def get_num_fits(grid: dict, cv: int) -> int:
+def get_path_hash(path: Path) -> str | None:
+    """
+    Returns sha256 of a file's content, or of names and contents of all files (recursively) for a directory.
+
+    :param path: path of the file or directory.
+    :return: hex digest, None if the path does not exist.
+    """
+    if os.path.isfile(path):
+        files = [path]
+    elif os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        return None
+
+    digest = hashlib.sha256()
+    for file in files:
+        if file != path:
+            digest.update(os.path.relpath(file, path).encode())
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_file_atomic(path: Path, writer: typing.Callable, mode: str = 'wb') -> None:
+    """
+    Writes file through a temporary file next to the target and then atomically replaces the target with it,
+    so that readers (e.g. the serving process) never observe a partially written artifact.
+
+    :param path: destination path of the file.
+    :param writer: callable that receives an open file object and writes the content.
+    :param mode: mode the temporary file is opened with ('wb' or 'w').
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as file:
+            writer(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def dump_joblib_atomic(obj, path: Path) -> None:
+    """
+    Dumps object with joblib, atomically replacing the previous version of the file.
+
+    :param obj: object to be saved.
+    :param path: destination path of the artifact.
+    """
+    import joblib
+
+    write_file_atomic(path, lambda file: joblib.dump(obj, file))
+
+
+def save_joblib_file(obj, path: Path, keep: bool = True) -> None:
+    """
+    Saves object with joblib through the artifact store (in the background during a pipeline run).
+    Objects are dumped uncompressed, so that their arrays can be memory-mapped when loaded.
+
+    :param obj: object to be saved.
+    :param path: destination path of the artifact.
+    :param keep: whether the store keeps the object in memory for the rest of the run, or only until it is written.
+    """
+    artifact_store.save(obj, path, dump_joblib_atomic, keep=keep)
+
+
+def load_joblib_file(path: Path, mmap_mode: str | None = None, keep: bool = True):
+    """
+    Loads object saved with joblib, taking it from the artifact store if it was saved or loaded during the current run.
+    mmap_mode only applies when the object is read from disk: an object held by the store is returned as it is,
+    with its arrays in memory, whatever mode it is requested with. Objects meant to be memory-mapped are therefore
+    saved and loaded without keep, so that the store drops them once they are written.
+
+    :param path: path of the artifact.
+    :param mmap_mode: mode of memory-mapping arrays of the object ('r' for read-only), None to read them into memory.
+    :param keep: whether the store keeps a loaded object in memory for the rest of the run.
+    """
+    import joblib
+
+    return artifact_store.load(path, partial(joblib.load, mmap_mode=mmap_mode), keep=keep)
+
+
+SHARED_MEMORY_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None  # memory-backed file system, if there is one
+
+
+def get_shared_memory_dir(nbytes: int) -> str | None:
+    """
+    Returns directory for files of nbytes shared between processes: the memory-backed file system if it has enough
+    free space (e.g. Docker limits /dev/shm to 64MB by default), None for the default temporary directory otherwise.
+    """
+    if SHARED_MEMORY_DIR is None:
+        return None
+    stats = os.statvfs(SHARED_MEMORY_DIR)
+    return SHARED_MEMORY_DIR if stats.f_bavail * stats.f_frsize > nbytes else None
+
+
+def get_shared_array(array, path: Path):
     """
-    Returns number of all total fits (number of folds times number of all combinations of hyper-parameters) for a GridSearch
+    Returns array backed by a read-only memory-mapped .npy file, written to path unless the array is memory-mapped
+    already. joblib passes memory-mapped arrays to worker processes as a reference to the file, so a run keeps
+    a single shared copy of the array for the workers of all searches, where joblib would dump one copy per search
+    (it memory-maps arrays over 1MB on its own). This does not bound memory use of the workers: cross-validation
+    copies every fold it indexes out of the array, so peak RSS still grows with the number of workers.
+
+    :param array: ndarray, other objects (e.g. sparse matrices) are returned as they are.
+    :param path: path of the .npy file.
+    :return: np.memmap
+    """
+    if not isinstance(array, np.ndarray) or isinstance(array, np.memmap):
+        return array
+    np.save(path, array, allow_pickle=False)
+    return np.load(path, mmap_mode='r')
+
+
+SEARCH_TYPES = ('grid', 'random', 'halving', 'halving_random')
+
+
+def get_num_fits(grid: dict, cv: int, search: dict | None = None, n_samples: int | None = None) -> int:
+    """
+    Returns number of all total fits for a hyper-parameter search (not counting the final refit):
+    number of folds times number of all combinations of hyper-parameters for a GridSearch, times number of sampled
+    combinations (n_iter) for a randomized search, and summed over iterations of successive halving.
     :param grid: hyper-parameter dictionary for a given model.
     :param cv: number of folds used in cross validation.
+    :param search: search settings of the model (as returned by setup_search), exhaustive grid search by default.
+    :param n_samples: number of training samples, used to determine number of halving iterations.
     :return: int, number of total fits .
     """
     num_cand = [len(params) if params else 1 for params in grid.values()]
-    return cv * (reduce(lambda x, y: x * y, num_cand) if grid else 1)
+    n_candidates = reduce(lambda x, y: x * y, num_cand) if grid else 1
+    search = search or {'type': 'grid'}
+
+    if search['type'] in ('random', 'halving_random'):
+        n_candidates = min(search['n_iter'], n_candidates)  # sampling from lists stops once all combinations are drawn
+    if search['type'] in ('grid', 'random'):
+        return cv * n_candidates
+
+    return cv * sum(get_halving_candidates(n_candidates, search, cv, n_samples))
+
+
+def get_halving_candidates(n_candidates: int, search: dict, cv: int, n_samples: int | None = None) -> list:
+    """
+    Returns number of candidates evaluated in each iteration of successive halving (mirroring scikit-learn's schedule):
+    iterations continue until fewer than factor candidates are left or the resource is exhausted.
+
+    :param n_candidates: number of candidates in the first iteration.
+    :param search: search settings of the model (as returned by setup_search).
+    :param cv: number of folds used in cross validation.
+    :param n_samples: number of training samples (resource of the n_samples type), None if unknown.
+    :return: list of numbers of candidates.
+    """
+    factor = search['factor']
+    n_required = 1 + floor(log(n_candidates, factor))
+
+    max_resources = search['max_resources']
+    if max_resources == 'auto':
+        max_resources = n_samples if search['resource'] == 'n_samples' else None
+    n_iterations = n_required
+    if max_resources is not None:
+        min_resources = search['min_resources']
+        if min_resources in ('smallest', 'exhaust'):
+            min_resources = 2 * cv if search['resource'] == 'n_samples' else 1
+            if search['min_resources'] == 'exhaust':
+                min_resources = max(min_resources, max_resources // factor ** (n_required - 1))
+        n_iterations = min(n_required, 1 + floor(log(max_resources // min_resources, factor)))
+
+    candidates = [n_candidates]
+    for _ in range(n_iterations - 1):
+        candidates.append(ceil(candidates[-1] / factor))
+    return candidates
+
+
+def allocate_cpu_budget(num_fits: dict, cpu_budget: int) -> dict:
+    """
+    Splits CPU budget between models proportionally to their number of fits, so that a large grid gets more cores
+    than cheap models. Every model gets at least one core and no more cores than it has fits.
+
+    :param num_fits: dict of model name to its number of fits.
+    :param cpu_budget: number of cores available for training.
+    :return: dict of model name to number of jobs its search may use.
+    """
+    total = sum(num_fits.values())
+    return {name: max(1, min(fits, cpu_budget * fits // total)) for name, fits in num_fits.items()}
 
 
 def setup_param_grid(models_params: dict, name: str) -> dict:
@@ -86,6 +271,41 @@ def setup_param_grid(models_params: dict, name: str) -> dict:
     return param_grid
 
 
+def setup_search(models_params: dict, name: str) -> dict:
+    """
+    Returns search settings for a given model. The search type is taken from the search key
+    (grid, random, halving or halving_random); without it, random search is used if random_search parameters are given
+    and exhaustive grid search otherwise.
+
+    :param models_params: hyper-parameter grid for all models included in yaml file
+    :param name: name of the model
+    :raises ValueError: if search type is unknown.
+    :return: dict with search type, cv, n_iter (sampled candidates) and successive halving settings.
+    """
+    model_params = models_params.get(name, {})
+
+    match model_params:
+        case {'search': search_type}:
+            pass
+        case {'random_search': d} if d:
+            search_type = 'random'
+        case other:
+            search_type = 'grid'
+
+    if search_type not in SEARCH_TYPES:
+        raise ValueError(f"Unknown search type '{search_type}' for {name}, expected one of: {', '.join(SEARCH_TYPES)}.")
+
+    return {
+        'type': search_type,
+        'cv': model_params.get('cv', 5),
+        'n_iter': model_params.get('n_iter', 10),
+        'factor': model_params.get('factor', 3),
+        'resource': model_params.get('resource', 'n_samples'),
+        'min_resources': model_params.get('min_resources', 'exhaust'),
+        'max_resources': model_params.get('max_resources', 'auto'),
+    }
+
+
 def get_param_grid(model_params: dict) -> dict:
     """
     Returns a dictionary of hyperparameters for a given model name.
@@ -2,6 +2,7 @@ import pydantic
 from pydantic import BaseModel, Field, model_validator, constr
 from pathlib import Path
 import typing
+import threading
 import os
 
 from mlengine.common.utils import read_yaml
@@ -39,11 +40,18 @@ class DataIngestionSettings(UnexpectedPropertyValidator):
     zipped_file: str
     unzip_dir: Path
     data_file: str
+    sha256: typing.Optional[constr(pattern='^[0-9a-fA-F]{64}$')]
+    chunk_size: pydantic.PositiveInt
+    timeout: pydantic.PositiveFloat
+    retries: pydantic.NonNegativeInt
+    extract: pydantic.StrictBool
 
 
 class DataValidationSettings(UnexpectedPropertyValidator):
     root_dir: Path
     req_files: typing.List
+    chunksize: typing.Optional[pydantic.PositiveInt]
+    n_jobs: pydantic.PositiveInt
     status_file: str
 
 
@@ -57,6 +65,8 @@ class DataTransformationSettings(UnexpectedPropertyValidator):
 class DataValidationPostTransformSettings(UnexpectedPropertyValidator):
     root_dir: Path
     req_files: typing.List
+    chunksize: typing.Optional[pydantic.PositiveInt]
+    n_jobs: pydantic.PositiveInt
     status_file: str
 
 
@@ -74,10 +84,22 @@ class ModelSettings(UnexpectedPropertyValidator):
     preprocessing: constr(pattern='^(joint|disjoint)$')
 
 
+class FeatureSelectionSettings(UnexpectedPropertyValidator):
+    method: constr(pattern='^(rfe|model|univariate|none)$')
+    estimator: constr(pattern='^(svr|ridge|lasso|random_forest)$')
+    step: pydantic.PositiveInt | pydantic.confloat(gt=0, lt=1)  # number of features, or fraction of the remaining ones
+    n_features: typing.Optional[pydantic.PositiveInt]
+    threshold: str | float
+    score_func: constr(pattern='^(f_regression|mutual_info_regression)$')
+    percentile: pydantic.conint(gt=0, le=100)
+    random_state: int
+
+
 class ModelPreprocessingSettings(UnexpectedPropertyValidator):
     root_dir: Path
     req_files: typing.List
     prep_pipeline_file: str
+    feature_selection: FeatureSelectionSettings
     status_file: Path
 
 
@@ -85,6 +107,9 @@ class ModelTrainingSettings(UnexpectedPropertyValidator):
     root_dir: Path
     models_dir: Path
     req_files: typing.List
+    params_file: Path
+    cpu_budget: int
+    random_state: int
     metrics_file: str
     status_file: Path
 
@@ -103,9 +128,65 @@ class ModelTestingSettings(UnexpectedPropertyValidator):
     req_files: typing.List
     metrics_file: str
     selected_test_metric: str
+    linear_table_file: str
     status_file: Path
 
 
+class DataFormatSettings(UnexpectedPropertyValidator):
+    frames: constr(pattern='^(parquet|feather|csv)$')
+    arrays: constr(pattern='^(npy|csv)$')
+    export_csv: pydantic.StrictBool
+    mmap: pydantic.StrictBool
+
+
+class TransformCacheSettings(UnexpectedPropertyValidator):
+    enabled: pydantic.StrictBool
+    root_dir: Path
+
+
+class StreamingSettings(UnexpectedPropertyValidator):
+    enabled: pydantic.StrictBool
+    chunksize: pydantic.PositiveInt
+    epochs: pydantic.PositiveInt
+
+
+class SchedulerSettings(UnexpectedPropertyValidator):
+    max_workers: pydantic.PositiveInt
+
+
+class ArtifactStoreSettings(UnexpectedPropertyValidator):
+    enabled: pydantic.StrictBool
+    write_workers: pydantic.PositiveInt
+    mmap_models: pydantic.StrictBool
+
+
+class IncrementalSettings(UnexpectedPropertyValidator):
+    enabled: pydantic.StrictBool
+    fingerprints_dir: Path
+
+
+class MicroBatchingSettings(UnexpectedPropertyValidator):
+    enabled: pydantic.StrictBool
+    max_wait_ms: pydantic.NonNegativeFloat
+    max_batch_size: pydantic.PositiveInt
+
+
+class PredictionSettings(UnexpectedPropertyValidator):
+    reload_interval: pydantic.NonNegativeFloat
+    reload_check: constr(pattern='^(mtime|hash)$')
+    max_batch_size: pydantic.PositiveInt
+    compiled_preprocessor: pydantic.StrictBool
+    linear_table: pydantic.StrictBool
+    cache_size: pydantic.NonNegativeInt
+    micro_batching: MicroBatchingSettings
+
+
+class ServingSettings(UnexpectedPropertyValidator):
+    executor: constr(pattern='^(thread|process)$')
+    workers: pydantic.PositiveInt
+    max_pending: pydantic.PositiveInt
+
+
 class PlotLayoutsSettings(UnexpectedPropertyValidator):
     features_plots_layout: typing.Dict = Field(default_factory=dict)
 
@@ -125,6 +206,16 @@ class Settings(UnexpectedPropertyValidator):
     model_validation: ModelValidationSettings
     model_testing: ModelTestingSettings
 
+    data_format: DataFormatSettings
+    transform_cache: TransformCacheSettings
+    streaming: StreamingSettings
+    scheduler: SchedulerSettings
+    incremental: IncrementalSettings
+    artifact_store: ArtifactStoreSettings
+
+    prediction: PredictionSettings
+    serving: ServingSettings
+
     plot_layouts: PlotLayoutsSettings
 
 
@@ -138,4 +229,22 @@ class SettingsManager(metaclass=Singleton):
         return Settings(**self.settings)
 
 
-settings = SettingsManager().initialize_settings()
+class LazySettings:
+    """
+    Proxy of the application settings. settings.yaml is parsed and validated on first attribute access
+    instead of at import time, so importing modules that depend on settings stays cheap.
+    """
+
+    def __init__(self):
+        self._settings = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._settings is None:
+            with self._lock:
+                if self._settings is None:
+                    self._settings = SettingsManager().initialize_settings()
+        return getattr(self._settings, name)
+
+
+settings = LazySettings()
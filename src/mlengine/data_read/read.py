@@ -1,11 +1,26 @@
 from box import ConfigBox
 from pathlib import Path
+import functools
+import importlib.util
 import os
+import typing
+import numpy as np
 import pandas as pd
+import shutil
 import urllib.request as request
 import zipfile
+from http.client import HTTPException
+from urllib.error import HTTPError
+from mlengine.common.artifacts import artifact_store
+from mlengine.common.exceptions import DataIngestionException
 from mlengine.common.logger import logger
-from mlengine.common.utils import create_directories
+from mlengine.common.utils import create_directories, get_path_hash, write_file_atomic
+from mlengine.config.settings import settings
+from mlengine.dataops.schema import DataSchema
+
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'  # multithreaded parser if available
+PARQUET_ROW_GROUP_SIZE = 128 * 1024  # rows, bounds memory needed to stream a parquet artifact in chunks
+DATA_FILE_SUFFIXES = {'parquet': '.parquet', 'feather': '.feather', 'npy': '.npy', 'csv': '.csv'}
 
 
 class DataIngestion:
@@ -16,27 +31,335 @@ class DataIngestion:
     def _create_dirs(self):
         create_directories([self.config.root_dir])
 
+    def _is_valid_archive(self, path: Path) -> bool:
+        """
+        Checks the archive against the configured sha256, or only that it is a complete zip if there is none.
+        """
+        if self.config.sha256 is not None:
+            return get_path_hash(path) == self.config.sha256.lower()
+        return zipfile.is_zipfile(path)
+
+    def is_archive_valid(self) -> bool:
+        """
+        Returns True if the zip has been downloaded and passes the integrity check.
+        """
+        return os.path.exists(self.config.zipped_file) and self._is_valid_archive(self.config.zipped_file)
+
+    def _download_part(self, part_file: str) -> None:
+        """
+        Streams the source into the partial file, resuming from its current size with an HTTP range request.
+        """
+        offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            response = request.urlopen(request.Request(self.config.source_URL, headers=headers), timeout=self.config.timeout)
+        except HTTPError as e:
+            if e.code == 416 and offset:
+                return  # nothing left to download
+            raise
+
+        with response:
+            if offset and response.status != 206:
+                logger.info(f"Server does not support resuming, downloading {self.config.source_URL} from the start")
+                offset = 0
+            length = response.headers.get('Content-Length')
+            total = offset + int(length) if length is not None else None
+            downloaded, logged = offset, 0
+            with open(part_file, 'ab' if offset else 'wb') as file:
+                while chunk := response.read(self.config.chunk_size):
+                    file.write(chunk)
+                    downloaded += len(chunk)
+                    if total and (progress := downloaded * 10 // total) > logged:
+                        logged = progress
+                        logger.info(f"Downloaded {downloaded} of {total} bytes ({10 * progress}%)")
+            if total is not None and downloaded < total:
+                raise ConnectionError(f"Download interrupted after {downloaded} of {total} bytes")
+
     def download_file(self):
-        if not os.path.exists(self.config.zipped_file):
-            filename, headers = request.urlretrieve(
-                url=self.config.source_URL,
-                filename=self.config.zipped_file
-            )
-            logger.info(f"{filename} downloaded. Headers: \n{headers}")
-        else:
-            logger.info(f"File already exists")
+        """
+        Downloads the zip in chunks to a .part file, resuming it on retries, and moves it in place once it passes
+        the integrity check. An existing zip is kept only if it passes the check as well.
+
+        :raises DataIngestionException: if the download fails after all retries or the checksum does not match.
+        """
+        zipped_file = self.config.zipped_file
+        if os.path.exists(zipped_file):
+            if self._is_valid_archive(zipped_file):
+                logger.info(f"File already exists")
+                return
+            logger.warning(f"{zipped_file} is incomplete or does not match the checksum, downloading it again")
+            os.remove(zipped_file)
+
+        part_file = f'{zipped_file}.part'
+        for attempt in range(self.config.retries + 1):
+            try:
+                self._download_part(part_file)
+                break
+            except (OSError, HTTPException) as e:  # URLError and timeouts included
+                if attempt == self.config.retries or isinstance(e, HTTPError) and e.code < 500:
+                    raise DataIngestionException('ING_EX_001', f'Download of {self.config.source_URL} failed: {e}') from e
+                logger.warning(f"Download of {self.config.source_URL} failed ({e}), resuming (retry {attempt + 1} of {self.config.retries})")
+
+        if not self._is_valid_archive(part_file):
+            os.remove(part_file)
+            raise DataIngestionException('ING_EX_002', f'Downloaded {zipped_file} is not a valid zip or does not match the checksum.')
+        os.replace(part_file, zipped_file)
+        logger.info(f"{zipped_file} downloaded.")
 
     def extract_zip_file(self):
         """
-        zip_file_path: str
-        Extracts the zip file into the data directory
-        Function returns None
+        Extracts the data file from the zip into the data directory, streaming it without extracting other members.
+        Nothing is extracted if extract is disabled, the data file is then read from the zip directly.
         """
+        if not self.config.extract:
+            logger.info(f"Extraction disabled, {self.config.data_file} is read from {self.config.zipped_file}")
+            return
         unzip_path = self.config.unzip_dir
         os.makedirs(unzip_path, exist_ok=True)
         with zipfile.ZipFile(self.config.zipped_file, 'r') as zip_ref:
-            zip_ref.extractall(unzip_path)
+            with zip_ref.open(get_archive_member(zip_ref, self.config.data_file)) as member:
+                write_file_atomic(os.path.join(unzip_path, self.config.data_file),
+                                  lambda file: shutil.copyfileobj(member, file, self.config.chunk_size))
+
+
+def get_archive_member(archive: zipfile.ZipFile, data_file: str) -> str:
+    """
+    Returns name of the archive member holding the data file: data_file, or the only file in the archive.
+
+    :param archive: opened zip archive.
+    :param data_file: name of the data file, as configured for data ingestion.
+    """
+    names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    matches = [name for name in names if name == data_file or os.path.basename(name) == data_file]
+    if matches:
+        return matches[0]
+    if len(names) == 1:
+        return names[0]
+    raise DataIngestionException('ING_EX_003', f'{archive.filename} does not contain {data_file}.')
+
+
+def _select_columns(names: typing.Iterable, usecols: typing.Iterable | None) -> list | None:
+    """
+    Returns names of the given columns present in the file (in the file's order), None to read all of them.
+    """
+    if usecols is None:
+        return None
+    usecols = set(usecols)
+    return [name for name in names if name in usecols]
+
+
+def read_csv_file(filepath: Path | typing.IO, schema: DataSchema | None = None, usecols: list | None = None,
+                  chunksize: int | None = None) -> pd.DataFrame | typing.Iterator[pd.DataFrame]:
+    """
+    Reads CSV file, parsing columns of the schema (if given) into compact dtypes: categorical columns as category
+    and integer columns narrowed to their declared range (see DataSchema.downcast).
+
+    :param filepath: path or (seekable) file object of the CSV file.
+    :param schema: schema of the data.
+    :param usecols: columns to be read, columns missing in the file are skipped, all columns are read if None.
+    :param chunksize: number of rows per chunk, the file is read whole if None.
+    :return: DataFrame, or iterator of DataFrames if chunksize is given.
+    """
+    kwargs = {'dtype': schema.read_dtypes() if schema is not None else None}
+    if usecols is not None:
+        kwargs['usecols'] = _select_columns(pd.read_csv(filepath_or_buffer=filepath, delimiter=',', nrows=0).columns, usecols)
+        if hasattr(filepath, 'seek'):
+            filepath.seek(0)
+
+    if chunksize is not None:
+        # the pyarrow engine does not read in chunks
+        chunks = pd.read_csv(filepath_or_buffer=filepath, delimiter=',', chunksize=chunksize, **kwargs)
+        return (schema.downcast(chunk) for chunk in chunks) if schema is not None else chunks
+
+    df = pd.read_csv(filepath_or_buffer=filepath, delimiter=',', engine=CSV_ENGINE, **kwargs)
+    if CSV_ENGINE == 'pyarrow':
+        import pyarrow
+
+        pyarrow.default_memory_pool().release_unused()  # parse buffers would otherwise stay resident in the pool
+    return schema.downcast(df) if schema is not None else df
+
+
+def get_data_file_path(filepath: Path, data) -> Path:
+    """
+    Returns path a data artifact is saved under in the configured format: frames and arrays (target vectors,
+    preprocessed matrices) may use different formats.
+
+    :param filepath: logical (.csv) path of the artifact, as given in settings.
+    :param data: DataFrame, Series or ndarray to be saved.
+    """
+    data_format = settings.data_format.frames if isinstance(data, pd.DataFrame) else settings.data_format.arrays
+    return Path(filepath).with_suffix(DATA_FILE_SUFFIXES[data_format])
+
+
+def resolve_data_file(filepath: Path) -> Path:
+    """
+    Returns path of the existing (or pending to be written) file holding data of a logical .csv path:
+    the file in a configured columnar/array format if there is one, the downloaded zip for the ingested data file
+    if extraction is disabled, the path itself otherwise.
+
+    :param filepath: logical path of the artifact, as given in settings.
+    """
+    filepath = Path(filepath)
+    if filepath.suffix != '.csv':
+        return filepath
+    for data_format in (settings.data_format.frames, settings.data_format.arrays):
+        candidate = filepath.with_suffix(DATA_FILE_SUFFIXES[data_format])
+        if artifact_store.exists(candidate):
+            return candidate
+    ingestion = settings.data_ingestion
+    if not ingestion.extract and os.path.normpath(filepath) == os.path.normpath(os.path.join(ingestion.unzip_dir, ingestion.data_file)):
+        return Path(ingestion.zipped_file)
+    return filepath
+
+
+def _load_data_file(filepath: Path, schema: DataSchema | None = None, usecols: list | None = None):
+    match Path(filepath).suffix:
+        case '.parquet':
+            import pyarrow.parquet
+
+            columns = _select_columns(pyarrow.parquet.read_schema(filepath).names, usecols) if usecols is not None else None
+            return pd.read_parquet(filepath, columns=columns)
+        case '.feather':
+            import pyarrow
+
+            columns = _select_columns(pyarrow.ipc.open_file(pyarrow.memory_map(str(filepath))).schema.names, usecols) if usecols is not None else None
+            return pd.read_feather(filepath, columns=columns)
+        case '.npy':
+            # large numeric arrays are paged in on access instead of being read upfront
+            return np.load(filepath, mmap_mode='r' if settings.data_format.mmap else None)
+        case '.zip':
+            # the member is decompressed straight into the parser, without a copy on disk
+            with zipfile.ZipFile(filepath) as archive, archive.open(get_archive_member(archive, settings.data_ingestion.data_file)) as member:
+                return read_csv_file(member, schema, usecols)
+        case _:
+            return read_csv_file(filepath, schema, usecols)
+
+
+def _write_data_file(data, filepath: Path) -> None:
+    match Path(filepath).suffix:
+        case '.parquet':
+            write_file_atomic(filepath, lambda file: data.to_parquet(file, index=False, row_group_size=PARQUET_ROW_GROUP_SIZE))
+        case '.feather':
+            write_file_atomic(filepath, lambda file: data.to_feather(file))
+        case '.npy':
+            write_file_atomic(filepath, lambda file: np.save(file, data, allow_pickle=False))
+        case _:
+            write_file_atomic(filepath, lambda file: data.to_csv(file, index=False), mode='w')
+
+
+def read_data_file(filepath: Path, schema: DataSchema | None = None, usecols: list | None = None) -> pd.DataFrame | np.ndarray:
+    """
+    Reads data artifact regardless of the format it was saved in.
+
+    :param filepath: logical path of the artifact, as given in settings.
+    :param schema: schema of the data, giving dtypes of columns parsed from CSV (other formats keep the saved ones).
+    :param usecols: columns of a frame to be read, columns missing in the data are skipped, all columns are read if None.
+    :return: DataFrame, or (possibly memory-mapped, read-only) ndarray for data saved as an array.
+    """
+    source = resolve_data_file(filepath)
+    if usecols is not None and not artifact_store.holds(source):
+        # only the projection is read, and it is not shared, as other stages may need the whole frame
+        artifact_store.wait([source])
+        return _load_data_file(source, schema, usecols)
+
+    data = artifact_store.load(source, functools.partial(_load_data_file, schema=schema))
+    if usecols is not None and isinstance(data, pd.DataFrame):
+        data = data[_select_columns(data.columns, usecols)]
+    # frames are copied, so that callers modifying them do not affect other stages sharing them
+    return data.copy() if isinstance(data, pd.DataFrame) else data
+
+
+def read_data_file_chunks(filepath: Path, chunksize: int, schema: DataSchema | None = None,
+                          usecols: list | None = None) -> typing.Iterator[pd.DataFrame]:
+    """
+    Reads data artifact in chunks of rows, so that files larger than memory can be processed.
+    Chunks are indexed by row position in the file.
+
+    :param filepath: logical path of the artifact, as given in settings.
+    :param chunksize: number of rows per chunk.
+    :param schema: schema of the data, giving dtypes of columns parsed from CSV.
+    :param usecols: columns to be read, columns missing in the data are skipped, all columns are read if None.
+    :return: iterator of DataFrames.
+    """
+    filepath = resolve_data_file(filepath)
+    artifact_store.wait([filepath])  # chunks are read from disk, so the artifact has to be written first
+
+    match filepath.suffix:
+        case '.parquet':
+            import pyarrow.parquet
+
+            # memory use is bounded by the size of a row group (see PARQUET_ROW_GROUP_SIZE)
+            parquet_file = pyarrow.parquet.ParquetFile(filepath)
+            columns = _select_columns(parquet_file.schema_arrow.names, usecols)
+            chunks = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns))
+        case '.feather':
+            import pyarrow
+
+            reader = pyarrow.ipc.open_file(pyarrow.memory_map(str(filepath)))
+            columns = reader.schema.names if usecols is None else _select_columns(reader.schema.names, usecols)
+            chunks = (reader.get_batch(i).select(columns).to_pandas() for i in range(reader.num_record_batches))  # batches as written
+        case '.npy':
+            array = np.load(filepath, mmap_mode='r')
+            chunks = (pd.DataFrame(array[start:start + chunksize]) for start in range(0, len(array), chunksize))
+        case '.zip':
+            yield from _read_archive_chunks(filepath, chunksize, schema, usecols)
+            return
+        case _:
+            chunks = read_csv_file(filepath, schema, usecols, chunksize=chunksize)
+
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def read_data_files_chunks(filepaths: list, chunksize: int) -> typing.Iterator[tuple]:
+    """
+    Reads data artifacts holding the same rows (e.g. features and target) in aligned chunks. Formats may split files
+    into chunks differently (e.g. at row group boundaries), so the chunks of the other files are re-cut to match
+    the chunks of the first one.
+
+    :param filepaths: logical paths of the artifacts, as given in settings.
+    :param chunksize: number of rows per chunk.
+    :return: iterator of tuples of DataFrames, one per file.
+    """
+    readers = [read_data_file_chunks(filepath, chunksize) for filepath in filepaths]
+    buffers = [[] for _ in filepaths[1:]]
+    for chunk in readers[0]:
+        chunks = [chunk]
+        for filepath, reader, buffer in zip(filepaths[1:], readers[1:], buffers):
+            while sum(len(frame) for frame in buffer) < len(chunk):
+                frame = next(reader, None)
+                if frame is None:
+                    raise ValueError(f'{filepath} has fewer rows than {filepaths[0]}.')
+                buffer.append(frame)
+            frame = pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+            chunks.append(frame.iloc[:len(chunk)])
+            buffer[:] = [frame.iloc[len(chunk):]]
+        yield tuple(chunks)
+
+
+def _read_archive_chunks(filepath: Path, chunksize: int, schema: DataSchema | None, usecols: list | None) -> typing.Iterator[pd.DataFrame]:
+    with zipfile.ZipFile(filepath) as archive, archive.open(get_archive_member(archive, settings.data_ingestion.data_file)) as member:
+        # chunks of the CSV reader are indexed by row position already
+        yield from read_csv_file(member, schema, usecols, chunksize=chunksize)
+
+
+def save_data_file(data: pd.DataFrame | pd.Series | np.ndarray, filepath: Path) -> None:
+    """
+    Saves data artifact in the configured format, and additionally as CSV if export_csv is set.
 
+    :param data: DataFrame, Series or ndarray to be saved.
+    :param filepath: logical (.csv) path of the artifact, as given in settings.
+    """
+    target = get_data_file_path(filepath, data)
+    if isinstance(data, pd.DataFrame | pd.Series):
+        data = data.reset_index(drop=True)  # kept in memory without the index, the same way it is read back from the file
+    if settings.data_format.export_csv and target != Path(filepath):
+        artifact_store.save(pd.DataFrame(data) if isinstance(data, np.ndarray) else data, filepath, _write_data_file)
 
-def read_csv_file(filepath: Path) -> pd.DataFrame:
-    return pd.read_csv(filepath_or_buffer=filepath, delimiter=',')
+    if target.suffix == '.npy':
+        data = np.asarray(data)
+        data.flags.writeable = False
+    artifact_store.save(data, target, _write_data_file)
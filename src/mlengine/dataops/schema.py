@@ -0,0 +1,281 @@
+import multiprocessing
+import types
+import typing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pydantic
+
+from mlengine.common.exceptions import DataValidationException
+
+MAX_SAMPLE_ROWS = 10
+# signed only, so that differences of narrowed columns do not wrap around, and at least 16 bits wide,
+# so that sums of a few columns (e.g. total of scores, 300 at most) do not wrap around either
+INT_DTYPES = (np.int16, np.int32, np.int64)
+
+
+class Categorical:
+    """
+    Marker of a string field with a small, open set of values, e.g. Annotated[StrictStr, Categorical()].
+    Such columns are parsed into the category dtype, while their values are only type-checked.
+    """
+
+
+@dataclass(frozen=True)
+class ColumnSchema:
+    """
+    Rules of a single column: kind of values (str, int, float or bool), presence, nullability, allowed categories
+    and range bounds.
+    """
+    name: str
+    kind: str
+    required: bool = True
+    nullable: bool = False
+    categorical: bool = False
+    categories: tuple | None = None
+    ge: float | None = None
+    gt: float | None = None
+    le: float | None = None
+    lt: float | None = None
+
+    @classmethod
+    def from_field(cls, name: str, field_info) -> 'ColumnSchema':
+        """
+        Derives column rules from a pydantic field declaration, e.g. Literal['a', 'b'] for fixed categories,
+        Annotated[str, Categorical()] for categorical columns, conint(ge=0, le=100) for ranges, Optional[...] for
+        nullable columns and a default value for columns that may be absent.
+        """
+        annotation = field_info.annotation
+        nullable = False
+        if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+            args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+            nullable = len(args) < len(typing.get_args(annotation))
+            annotation = args[0]
+        metadata = list(field_info.metadata)
+        if typing.get_origin(annotation) is typing.Annotated:
+            # constraints of an Optional[...] field stay attached to the inner type
+            metadata += annotation.__metadata__
+            annotation = typing.get_args(annotation)[0]
+
+        categories = None
+        if typing.get_origin(annotation) is typing.Literal:
+            categories = typing.get_args(annotation)
+            annotation = type(categories[0])
+
+        kinds = {str: 'str', int: 'int', float: 'float', bool: 'bool'}
+        if annotation not in kinds:
+            raise ValueError(f'Field {name} of type {annotation} is not supported by the schema.')
+
+        bounds = {bound: getattr(item, bound) for item in metadata
+                  for bound in ('ge', 'gt', 'le', 'lt') if getattr(item, bound, None) is not None}
+        categorical = categories is not None or any(isinstance(item, Categorical) for item in metadata)
+        return cls(name=name, kind=kinds[annotation], required=field_info.is_required(), nullable=nullable,
+                   categorical=categorical, categories=categories, **bounds)
+
+    @property
+    def int_dtype(self) -> type | None:
+        """
+        Returns the narrowest integer type holding the declared range of an integer column, None if it is unbounded.
+        """
+        low = self.ge if self.ge is not None else self.gt + 1 if self.gt is not None else None
+        high = self.le if self.le is not None else self.lt - 1 if self.lt is not None else None
+        if self.kind != 'int' or low is None or high is None:
+            return None
+        return next((dtype for dtype in INT_DTYPES if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max), None)
+
+    def violations(self, column: pd.Series) -> dict[str, pd.Series]:
+        """
+        Checks the column with vectorized operations.
+
+        :return: dict of rule name to boolean mask of rows violating it.
+        """
+        null = column.isna()
+        result = {}
+        if not self.nullable:
+            result['null'] = null
+
+        if self.kind == 'str':
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # types are checked once per category, code -1 of missing values picks the trailing False
+                wrong_category = ~column.cat.categories.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+                wrong_type = pd.Series(np.append(wrong_category, False)[column.cat.codes.to_numpy()], index=column.index)
+            elif pd.api.types.is_string_dtype(column) and not pd.api.types.is_object_dtype(column):
+                wrong_type = pd.Series(False, index=column.index)
+            elif pd.api.types.is_object_dtype(column):
+                wrong_type = ~null & ~column.map(lambda value: isinstance(value, str), na_action='ignore').astype(bool)
+            else:
+                wrong_type = ~null
+            result['dtype'] = wrong_type
+        else:
+            if pd.api.types.is_bool_dtype(column) and self.kind != 'bool':
+                # bools are numbers to pandas (and Python), but not valid values of int or float columns
+                result['dtype'] = ~null
+                return result
+            values = column if pd.api.types.is_numeric_dtype(column) else pd.to_numeric(column, errors='coerce')
+            wrong_type = ~null & values.isna()
+            if pd.api.types.is_object_dtype(column) and self.kind != 'bool':
+                wrong_type |= column.map(lambda value: isinstance(value, (bool, np.bool_)), na_action='ignore').fillna(False).astype(bool)
+            if self.kind in ('int', 'bool') and not pd.api.types.is_integer_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                wrong_type |= ~values.isna() & (np.floor(values) != values)
+            if self.kind == 'bool':
+                wrong_type |= ~values.isna() & ~values.isin([0, 1])
+            result['dtype'] = wrong_type
+
+            checks = {'ge': values < self.ge if self.ge is not None else None,
+                      'gt': values <= self.gt if self.gt is not None else None,
+                      'le': values > self.le if self.le is not None else None,
+                      'lt': values >= self.lt if self.lt is not None else None}
+            out_of_range = [mask for mask in checks.values() if mask is not None]
+            if out_of_range:
+                result['range'] = np.logical_or.reduce(out_of_range) & ~values.isna()
+
+        if self.categories is not None:
+            result['category'] = ~null & ~column.isin(self.categories)
+
+        return result
+
+
+@dataclass
+class RuleViolations:
+    count: int = 0
+    rows: list = field(default_factory=list)
+
+
+class ValidationReport:
+    """
+    Violation counts and sample failing row indices per (column, rule), accumulated over one or more frames.
+    """
+
+    def __init__(self, max_samples: int = MAX_SAMPLE_ROWS):
+        self.max_samples = max_samples
+        self.n_rows = 0
+        self.violations: dict[tuple, RuleViolations] = {}
+
+    def add(self, column: str, rule: str, mask: pd.Series) -> None:
+        count = int(mask.sum())
+        if not count:
+            return
+        violations = self.violations.setdefault((column, rule), RuleViolations())
+        violations.count += count
+        if len(violations.rows) < self.max_samples:
+            violations.rows += mask.index[mask.to_numpy()][:self.max_samples - len(violations.rows)].tolist()
+
+    def merge(self, other: 'ValidationReport') -> 'ValidationReport':
+        self.n_rows += other.n_rows
+        for key, other_violations in other.violations.items():
+            violations = self.violations.setdefault(key, RuleViolations())
+            violations.count += other_violations.count
+            violations.rows = sorted(violations.rows + other_violations.rows)[:self.max_samples]
+        return self
+
+    @property
+    def valid(self) -> bool:
+        return not self.violations
+
+    def summary(self) -> str:
+        if self.valid:
+            return f'All {self.n_rows} rows are valid.'
+        lines = [f'{column} [{rule}]: {violations.count} rows, e.g. rows {violations.rows}'
+                 for (column, rule), violations in sorted(self.violations.items())]
+        return f'Violations found in {self.n_rows} rows:\n' + '\n'.join(lines)
+
+    def raise_for_violations(self, source: str = 'data') -> None:
+        """
+        :raises DataValidationException: if any rule is violated.
+        """
+        if not self.valid:
+            raise DataValidationException('VLD_EX_003', f'Validation of {source} failed. {self.summary()}')
+
+
+class DataSchema:
+    """
+    Column-wise schema derived from pydantic field declarations, validating whole frames with vectorized operations
+    instead of building a model instance for every row.
+    """
+
+    def __init__(self, columns: list[ColumnSchema]):
+        self.columns = columns
+
+    @classmethod
+    def from_model(cls, model: type[pydantic.BaseModel]) -> 'DataSchema':
+        return cls([ColumnSchema.from_field(name, field_info) for name, field_info in model.model_fields.items()])
+
+    @property
+    def names(self) -> list:
+        return [column.name for column in self.columns]
+
+    def read_dtypes(self) -> dict:
+        """
+        Returns dtypes to parse columns with: category for categorical columns. Categories are inferred from the data
+        rather than fixed to the declared ones, so that unexpected values are kept for validation to report.
+        """
+        return {column.name: 'category' for column in self.columns if column.categorical}
+
+    def downcast(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Narrows integer columns to the smallest type holding their declared range. Integers are not parsed into
+        narrow types directly, as the parser would silently wrap out-of-range values around; a column whose values
+        do not fit is left as it is (and reported by validation).
+
+        :param df: frame to be downcast in place.
+        :return: the frame.
+        """
+        for column in self.columns:
+            dtype = column.int_dtype
+            if dtype is None or column.name not in df.columns or not pd.api.types.is_integer_dtype(df[column.name]):
+                continue
+            values = df[column.name]
+            info = np.iinfo(dtype)
+            if values.empty or (not values.hasnans and info.min <= values.min() and values.max() <= info.max):
+                df[column.name] = values.astype(dtype)
+        return df
+
+    def validate(self, df: pd.DataFrame, report: ValidationReport | None = None) -> ValidationReport:
+        """
+        Validates frame against the schema. Row indices in the report are taken from the frame's index.
+
+        :param df: frame to be validated.
+        :param report: report to accumulate violations into, a new one is created if not given.
+        :return: validation report.
+        """
+        report = report or ValidationReport()
+        report.n_rows += len(df)
+        for column in self.columns:
+            if column.name not in df.columns:
+                if column.required:
+                    report.add(column.name, 'missing', pd.Series(True, index=df.index))
+                continue
+            for rule, mask in column.violations(df[column.name]).items():
+                report.add(column.name, rule, mask)
+        return report
+
+    def validate_chunks(self, chunks: typing.Iterable[pd.DataFrame], n_jobs: int = 1) -> ValidationReport:
+        """
+        Validates frame streamed in chunks, keeping only violation counts and a bounded number of sample rows,
+        so that memory use does not depend on the size of the data.
+
+        :param chunks: iterable of frames, indexed by row position in the data.
+        :param n_jobs: number of processes validating chunks, chunks are validated in this process if 1.
+        :return: validation report.
+        """
+        report = ValidationReport()
+        if n_jobs == 1:
+            for chunk in chunks:
+                self.validate(chunk, report)
+            return report
+
+        # at most 2 chunks per process are read ahead, which bounds memory use;
+        # workers are spawned, as forking a process running pipelines in threads is not safe
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('spawn')) as executor:
+            in_flight = set()
+            for chunk in chunks:
+                if len(in_flight) >= 2 * n_jobs:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report.merge(future.result())
+                in_flight.add(executor.submit(self.validate, chunk))
+            for future in in_flight:
+                report.merge(future.result())
+        return report
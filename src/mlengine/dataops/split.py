@@ -3,7 +3,7 @@ import os
 from pathlib import Path
 
 from mlengine.common.logger import logger
-from mlengine.data_read.read import read_csv_file
+from mlengine.data_read.read import read_data_file, save_data_file
 from sklearn.model_selection import train_test_split
 
 
@@ -17,7 +17,7 @@ class DataSplitter():
 
     def train_validate_test_split(self):
         try:
-            df = read_csv_file(self.data_file)
+            df = read_data_file(self.data_file)
             X, y = self.get_X_y(df, self.target)
             X_train, X_validate, X_test, y_train, y_validate, y_test = self.get_train_validate_test_X_y(X, y)
             self.save_split_data([X_train, X_validate, X_test, y_train, y_validate, y_test])
@@ -37,4 +37,4 @@ class DataSplitter():
 
     def save_split_data(self, split_data):
         for i, data in enumerate(split_data):
-            data.to_csv(os.path.join(self.root_dir, self.split_files[i]), index=False)
+            save_data_file(data, os.path.join(self.root_dir, self.split_files[i]))
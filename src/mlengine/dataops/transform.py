@@ -2,7 +2,8 @@ from box import ConfigBox
 import os
 from pathlib import Path
 
-from mlengine.data_read.read import read_csv_file
+from mlengine.data_read.read import read_data_file, save_data_file
+from mlengine.dataops.validate import StudentDataValidator
 
 
 class StudentDataTransformer:
@@ -13,9 +14,9 @@ class StudentDataTransformer:
         self.df = None
 
     def transform(self):
-        self.df = read_csv_file(filepath=self.data_file)
+        self.df = read_data_file(filepath=self.data_file, schema=StudentDataValidator.schema)
         # self.df['total_score'] = self.df['math_score'] + self.df['reading_score'] + self.df['writing_score']
         # self.df['average'] = self.df['total_score'] / 3
 
     def save(self):
-        self.df.to_csv(self.data_file_tnsf, index=False)
+        save_data_file(self.df, self.data_file_tnsf)
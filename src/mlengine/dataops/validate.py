@@ -1,66 +1,62 @@
 import pydantic
+import typing
 from box import ConfigBox
 import os
 from pathlib import Path
 
+from mlengine.common.artifacts import artifact_store
 from mlengine.common.logger import logger
 from mlengine.common.utils import create_directories
 from mlengine.common.exceptions import MissingCriticalFileException
-from mlengine.data_read.read import read_csv_file
+from mlengine.data_read.read import read_data_file, read_data_file_chunks, resolve_data_file
+from mlengine.dataops.schema import Categorical, DataSchema
+
+
+CategoryStr = typing.Annotated[pydantic.StrictStr, Categorical()]
+ScoreInt = pydantic.conint(strict=True, ge=0, le=100)
 
 
 class StudentDataTypesValidator(pydantic.BaseModel):
-    gender: pydantic.StrictStr
-    race_ethnicity: pydantic.StrictStr
-    parental_level_of_education: pydantic.StrictStr
-    lunch: pydantic.StrictStr
-    test_preparation_course: pydantic.StrictStr
-    math_score: pydantic.StrictInt
-    reading_score: pydantic.StrictInt
-    writing_score: pydantic.StrictInt
-
-
-class StudentTransformedDataTypesValidator(pydantic.BaseModel):
-    gender: pydantic.StrictStr
-    race_ethnicity: pydantic.StrictStr
-    parental_level_of_education: pydantic.StrictStr
-    lunch: pydantic.StrictStr
-    test_preparation_course: pydantic.StrictStr
-    math_score: pydantic.StrictInt
-    reading_score: pydantic.StrictInt
-    writing_score: pydantic.StrictInt
-    total_score: pydantic.StrictInt
-    average: pydantic.StrictFloat
+    gender: CategoryStr
+    race_ethnicity: CategoryStr
+    parental_level_of_education: CategoryStr
+    lunch: CategoryStr
+    test_preparation_course: CategoryStr
+    math_score: ScoreInt
+    reading_score: ScoreInt
+    writing_score: ScoreInt
 
 
-class StudentDataValidator:
-    def __init__(self, config: ConfigBox):
-        self.config: ConfigBox = config
-        self.data_file: Path = self.config.req_files[0]
+class StudentTransformedDataTypesValidator(StudentDataTypesValidator):
+    # not added by the transformation yet, so the columns are validated only when present
+    total_score: typing.Optional[pydantic.conint(strict=True, ge=0, le=300)] = None
+    average: typing.Optional[pydantic.confloat(strict=True, ge=0, le=100)] = None
 
-    def validate_data(self):
-        try:
-            df = read_csv_file(self.data_file)
-            data_list = [StudentDataTypesValidator(**row) for _, row in df.iterrows()]
-            logger.info(f'Successful validation of data file {self.data_file} via Pydantic strict types')
-        except Exception as e:
-            raise e
 
+class StudentDataValidator:
+    schema = DataSchema.from_model(StudentDataTypesValidator)
 
-class StudentTransformedDataValidator:
     def __init__(self, config: ConfigBox):
         self.config: ConfigBox = config
         self.data_file: Path = self.config.req_files[0]
 
     def validate_data(self):
         try:
-            df = read_csv_file(self.data_file)
-            data_list = [StudentDataTypesValidator(**row) for _, row in df.iterrows()]
-            logger.info(f'Successful validation of data file {self.data_file} via Pydantic strict types')
+            if self.config.chunksize is not None:
+                chunks = read_data_file_chunks(self.data_file, self.config.chunksize, self.schema, usecols=self.schema.names)
+                report = self.schema.validate_chunks(chunks, n_jobs=self.config.n_jobs)
+            else:
+                report = self.schema.validate(read_data_file(self.data_file, self.schema, usecols=self.schema.names))
+            report.raise_for_violations(str(self.data_file))
+            logger.info(f'Successful validation of data file {self.data_file} against the schema: {report.summary()}')
         except Exception as e:
             raise e
 
 
+class StudentTransformedDataValidator(StudentDataValidator):
+    schema = DataSchema.from_model(StudentTransformedDataTypesValidator)
+
+
 class FileValidator:
     def __init__(self, config: ConfigBox):
         self.config: ConfigBox = config
@@ -77,7 +73,7 @@ class FileValidator:
             messages = []
 
             for file in self.config.req_files:
-                validation_status = os.path.isfile(file)
+                validation_status = artifact_store.exists(resolve_data_file(file))
                 statuses.append(validation_status)
 
                 msg = f"Validation status: {validation_status} for file: {file}"
@@ -0,0 +1,52 @@
+import glob
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+from mlengine.common.artifacts import artifact_store
+from mlengine.common.logger import logger
+from mlengine.common.utils import create_directories, get_path_hash, load_joblib_file, write_file_atomic
+from mlengine.config.settings import settings
+from mlengine.data_read.read import read_data_file, resolve_data_file
+
+
+def get_transformed_data(preprocessing_pipeline_path: Path, data_file: Path, data=None) -> np.ndarray:
+    """
+    Returns features from a data file transformed by the preprocessing pipeline. The transformed matrix is cached
+    as .npy keyed by hashes of the pipeline and the data file, so that training and the evaluations transform
+    each split at most once (and not at all, if neither the pipeline nor the split changed since the last run).
+
+    :param preprocessing_pipeline_path: path of the fitted preprocessing pipeline.
+    :param data_file: logical path of the features data file.
+    :param data: features already read from the data file, it is read if needed and not given.
+    :return: transformed features (read-only, possibly memory-mapped).
+    """
+    if not settings.transform_cache.enabled:
+        return load_joblib_file(preprocessing_pipeline_path).transform(data if data is not None else read_data_file(data_file))
+
+    source = resolve_data_file(data_file)
+    artifact_store.wait([preprocessing_pipeline_path, source])  # both are hashed, so they have to be on disk
+    key = hashlib.sha256((get_path_hash(preprocessing_pipeline_path) + get_path_hash(source)).encode()).hexdigest()[:16]
+    cache_path = Path(os.path.join(settings.transform_cache.root_dir, f'{Path(data_file).stem}_{key}.npy'))
+
+    def load_or_transform(path: Path):
+        if os.path.exists(path):
+            logger.info(f"Transformed {data_file} loaded from cache: {path}")
+            return np.load(path, mmap_mode='r' if settings.data_format.mmap else None)
+
+        features = load_joblib_file(preprocessing_pipeline_path).transform(data if data is not None else read_data_file(data_file))
+        if not isinstance(features, np.ndarray):
+            return features  # sparse output is not cached
+
+        features.flags.writeable = False
+        create_directories([settings.transform_cache.root_dir], verbose=False)
+        write_file_atomic(path, lambda file: np.save(file, features, allow_pickle=False))
+        for stale_path in glob.glob(os.path.join(settings.transform_cache.root_dir, f'{Path(data_file).stem}_*.npy')):
+            if os.path.normpath(stale_path) != os.path.normpath(path):
+                os.remove(stale_path)  # transformed by a previous pipeline or from a previous split
+        logger.info(f"Transformed {data_file} cached to: {path}")
+        return features
+
+    return artifact_store.load(cache_path, load_or_transform)
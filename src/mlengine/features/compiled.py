@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+from pathlib import Path
+import joblib
+
+from mlengine.common.exceptions import UnknownCategoryException
+
+
+class CompiledPreprocessor:
+    """
+    Array-backed equivalent of the fitted preprocessing pipeline built by mlengine.features.prep.Preprocessor
+    (ColumnTransformer of SimpleImputer -> StandardScaler and SimpleImputer -> OneHotEncoder, followed by a feature selector).
+
+    All fitted state is flattened into impute fill values, scaler mean/scale vectors and category -> output column
+    tables with the selector mask already applied, so transforming a record costs a few dict lookups and array
+    operations. Input can be a single dict, a list of dicts, a NumPy record array or a DataFrame.
+    """
+
+    def __init__(self, num_features: list, num_fill: np.ndarray, num_mean: np.ndarray, num_scale: np.ndarray,
+                 num_columns: np.ndarray, cat_features: list, cat_fill: list, cat_tables: list, n_output: int):
+        self.num_features = num_features
+        self.num_fill = num_fill
+        self.num_mean = num_mean
+        self.num_scale = num_scale
+        self.num_columns = num_columns  # output column of every numerical feature, -1 if removed by the selector
+        self.cat_features = cat_features
+        self.cat_fill = cat_fill
+        self.cat_tables = cat_tables  # per categorical feature: category -> output column, -1 if removed by the selector
+        self.n_output = n_output
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> 'CompiledPreprocessor':
+        """
+        Compiles fitted sklearn preprocessing pipeline.
+
+        :param pipeline: fitted sklearn Pipeline with a ColumnTransformer as the first step and (optionally) a selector exposing get_support() as the last one.
+        :raises ValueError: if the pipeline contains steps that cannot be compiled.
+        :return: CompiledPreprocessor object.
+        """
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        column_transformer = pipeline.steps[0][1]
+        if not isinstance(column_transformer, ColumnTransformer) or column_transformer.sparse_output_:
+            raise ValueError('First step of the pipeline must be a ColumnTransformer with dense output.')
+
+        steps = [step for _, step in pipeline.steps[1:]]
+        if len(steps) > 1 or (steps and not hasattr(steps[0], 'get_support')):
+            raise ValueError('Only a single feature selector may follow the ColumnTransformer.')
+
+        num_features, num_fill, num_mean, num_scale = [], [], [], []
+        cat_features, cat_fill, cat_categories = [], [], []
+        blocks = []
+
+        for name, transformer, columns in column_transformer.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            step_types = [type(step) for _, step in getattr(transformer, 'steps', [])]
+            if step_types == [SimpleImputer, StandardScaler]:
+                imputer, scaler = transformer.steps[0][1], transformer.steps[1][1]
+                num_features += list(columns)
+                num_fill += list(imputer.statistics_)
+                num_mean += list(scaler.mean_ if scaler.with_mean else np.zeros(len(columns)))
+                num_scale += list(scaler.scale_ if scaler.with_std else np.ones(len(columns)))
+                blocks.append(('num', len(columns)))
+            elif step_types == [SimpleImputer, OneHotEncoder]:
+                imputer, encoder = transformer.steps[0][1], transformer.steps[1][1]
+                if encoder.drop_idx_ is not None or encoder.handle_unknown != 'error' or getattr(encoder, '_infrequent_enabled', False):
+                    raise ValueError(f'OneHotEncoder of {name} uses options that cannot be compiled.')
+                cat_features += list(columns)
+                cat_fill += list(imputer.statistics_)
+                cat_categories += [list(categories) for categories in encoder.categories_]
+                blocks.append(('cat', sum(len(categories) for categories in encoder.categories_)))
+            else:
+                raise ValueError(f'Transformer {name} cannot be compiled.')
+
+        if [kind for kind, _ in blocks] not in (['num', 'cat'], ['num'], ['cat']):
+            raise ValueError('ColumnTransformer must contain one numerical block followed by one categorical block.')
+
+        n_input = sum(width for _, width in blocks)
+        support = steps[0].get_support() if steps else np.ones(n_input, dtype=bool)
+        output_index = np.where(support, np.cumsum(support) - 1, -1)
+
+        num_columns = output_index[:len(num_features)]
+        offset = len(num_features)
+        cat_tables = []
+        for categories in cat_categories:
+            cat_tables.append({category: int(output_index[offset + i]) for i, category in enumerate(categories)})
+            offset += len(categories)
+
+        return cls(num_features=num_features,
+                   num_fill=np.asarray(num_fill, dtype=np.float64),
+                   num_mean=np.asarray(num_mean, dtype=np.float64),
+                   num_scale=np.asarray(num_scale, dtype=np.float64),
+                   num_columns=num_columns,
+                   cat_features=cat_features,
+                   cat_fill=cat_fill,
+                   cat_tables=cat_tables,
+                   n_output=int(support.sum()))
+
+    @classmethod
+    def from_file(cls, pipeline_path: Path) -> 'CompiledPreprocessor':
+        return cls.from_pipeline(joblib.load(pipeline_path))
+
+    def transform(self, features) -> np.ndarray:
+        """
+        Transforms records into the preprocessed (scaled, one-hot encoded and selected) feature matrix.
+
+        :param features: dict, list of dicts, NumPy record array or DataFrame with the raw features.
+        :raises UnknownCategoryException: if a categorical value was not seen during fitting (a ValueError, same as OneHotEncoder(handle_unknown='error')).
+        :return: np.ndarray of shape (n_records, n_selected_features).
+        """
+        if isinstance(features, Mapping):
+            features = [features]
+        columns = get_feature_columns(features, self.num_features + self.cat_features)
+        n_rows = len(columns[0]) if columns else 0
+        output = np.zeros((n_rows, self.n_output), dtype=np.float64)
+
+        for j, name in enumerate(self.num_features):
+            column = self.num_columns[j]
+            if column < 0:
+                continue
+            values = np.asarray(columns[j], dtype=np.float64)
+            values = np.where(np.isnan(values), self.num_fill[j], values)
+            output[:, column] = (values - self.num_mean[j]) / self.num_scale[j]
+
+        rows = np.arange(n_rows)
+        for i, name in enumerate(self.cat_features):
+            table, fill = self.cat_tables[i], self.cat_fill[i]
+            try:
+                indices = np.fromiter((table[fill if pd.isna(value) else value] for value in columns[len(self.num_features) + i]), dtype=np.intp, count=n_rows)
+            except KeyError as e:
+                raise UnknownCategoryException('PRD_EX_004', f'Found unknown category {e} in column {name} during transform.')
+            selected = indices >= 0
+            output[rows[selected], indices[selected]] = 1.0
+
+        return output
+
+    def check_parity(self, pipeline, records: list) -> bool:
+        """
+        Checks that the compiled transformer returns exactly the same matrix as the sklearn pipeline.
+
+        :param pipeline: fitted sklearn pipeline the transformer was compiled from.
+        :param records: list of dicts to transform with both implementations.
+        :return: bool, True if both outputs are bit for bit identical.
+        """
+        expected = np.asarray(pipeline.transform(pd.DataFrame(records)), dtype=np.float64)
+        return np.array_equal(expected, self.transform(records))
+
+    def probe_records(self) -> list:
+        """
+        Returns records covering every known category of every categorical feature at least once,
+        combined with imputed, boundary and fractional numerical values.
+        """
+        num_values = [[fill, fill - 3 * scale, fill + 3 * scale, 0.0, round(fill) + 0.5] for fill, scale in zip(self.num_fill, self.num_scale)]
+        n_records = max([len(table) for table in self.cat_tables] + [len(values) for values in num_values] + [1])
+        records = []
+        for k in range(n_records):
+            record = {name: values[k % len(values)] for name, values in zip(self.num_features, num_values)}
+            record.update({name: list(table)[k % len(table)] for name, table in zip(self.cat_features, self.cat_tables)})
+            records.append(record)
+        return records
+
+
+def get_feature_columns(features, names: list) -> list:
+    """
+    Extracts columns of raw features without building a DataFrame.
+
+    :param features: list of dicts, NumPy record array or DataFrame.
+    :param names: names of the columns to extract.
+    :return: list of column values (one sequence per name).
+    """
+    if isinstance(features, pd.DataFrame):
+        return [features[name].to_numpy() for name in names]
+    if isinstance(features, np.ndarray) and features.dtype.names:
+        return [features[name] for name in names]
+    return [[record[name] for record in features] for name in names]
+
+
+def compile_preprocessing_pipeline(pipeline, verify: bool = True) -> CompiledPreprocessor:
+    """
+    Compiles fitted preprocessing pipeline and (optionally) verifies bit for bit parity with sklearn on probe records.
+
+    :param pipeline: fitted sklearn preprocessing pipeline.
+    :param verify: if True, compiled transformer is checked against the pipeline before being returned.
+    :raises ValueError: if the pipeline cannot be compiled or the compiled output differs.
+    :return: CompiledPreprocessor object.
+    """
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+    if verify and not compiled.check_parity(pipeline, compiled.probe_records()):
+        raise ValueError('Compiled preprocessor output differs from the sklearn pipeline.')
+    return compiled
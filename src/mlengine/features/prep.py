@@ -1,16 +1,15 @@
 from box import ConfigBox
 from pathlib import Path
 import os
-import joblib
 
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
-from sklearn.feature_selection import RFE
-from sklearn.svm import SVR
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 
-from mlengine.data_read.read import read_csv_file
+from mlengine.data_read.read import read_data_file
+from mlengine.common.utils import save_joblib_file
+from mlengine.features.selection import get_feature_selector, fit_feature_selector
 
 
 class Preprocessor():
@@ -26,12 +25,12 @@ class Preprocessor():
         self.pipeline_file: Path = Path(os.path.join(self.config.root_dir, self.config.prep_pipeline_file))
 
     def get_features_data(self):
-        self.X_train = read_csv_file(self.X_train_file)
-        self.y_train = read_csv_file(self.y_train_file).squeeze()
+        self.X_train = read_data_file(self.X_train_file)
+        self.y_train = read_data_file(self.y_train_file).squeeze()
 
     def setup_preprocessing_pipeline(self):
-        num_features = self.X_train.select_dtypes(exclude="object").columns
-        cat_features = self.X_train.select_dtypes(include="object").columns
+        num_features = self.X_train.select_dtypes(exclude=["object", "string", "category"]).columns
+        cat_features = self.X_train.select_dtypes(include=["object", "string", "category"]).columns
 
         num_pipeline = Pipeline(steps=[
             ("SimpleImputer", SimpleImputer(strategy='mean')),
@@ -50,12 +49,18 @@ class Preprocessor():
             ]
         )
 
-        rfe = RFE(SVR(kernel="linear"), step=1)
+        steps = [('preprocessor', preprocessor)]
+        selector = get_feature_selector(self.config.feature_selection)
+        if selector is not None:
+            steps.append(('selector', selector))
 
-        self.prep_pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('rfe', rfe)])
+        self.prep_pipeline = Pipeline(steps=steps)
 
     def fit_train_data(self):
-        self.prep_pipeline.fit(self.X_train, self.y_train)
+        # equivalent to fitting the whole pipeline, but lets the fit time of the feature selection be reported
+        features = self.prep_pipeline.steps[0][1].fit_transform(self.X_train, self.y_train)
+        if len(self.prep_pipeline.steps) > 1:
+            fit_feature_selector(self.prep_pipeline.steps[-1][1], features, self.y_train)
 
     def save_preprocessing_pipeline(self):
-        joblib.dump(self.prep_pipeline, self.pipeline_file)
+        save_joblib_file(self.prep_pipeline, self.pipeline_file)
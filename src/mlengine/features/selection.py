@@ -0,0 +1,82 @@
+import time
+from functools import partial
+
+from box import ConfigBox
+
+from mlengine.common.logger import logger
+
+
+def get_selection_estimator(name: str, random_state: int):
+    """
+    Returns estimator whose coefficients or feature importances rank features for RFE and model-based selection.
+
+    :param name: svr (linear SVR), ridge, lasso or random_forest.
+    :param random_state: seed of randomized estimators.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import Lasso, Ridge
+    from sklearn.svm import SVR
+
+    match name:
+        case 'svr':
+            return SVR(kernel="linear")
+        case 'ridge':
+            return Ridge()
+        case 'lasso':
+            return Lasso(random_state=random_state)
+        case 'random_forest':
+            return RandomForestRegressor(random_state=random_state)
+        case other:
+            raise ValueError(f'Unknown feature selection estimator: {other}.')
+
+
+def get_feature_selector(config: ConfigBox):
+    """
+    Returns (unfitted) feature selector configured in settings:
+        rfe - recursive feature elimination, removing step features per refit of the estimator
+              (or a step fraction of the remaining ones if step < 1, which needs far fewer refits on wide data),
+        model - single fit of the estimator, keeping features whose coefficient or importance passes the threshold,
+        univariate - filter on univariate scores (f_regression or mutual_info_regression), no estimator fit at all,
+        none - no feature selection.
+
+    :param config: feature selection settings.
+    :return: selector exposing get_support(), None for no feature selection.
+    """
+    from sklearn.feature_selection import RFE, SelectFromModel, SelectKBest, SelectPercentile, f_regression, mutual_info_regression
+
+    match config.method:
+        case 'rfe':
+            return RFE(get_selection_estimator(config.estimator, config.random_state), n_features_to_select=config.n_features, step=config.step)
+        case 'model':
+            return SelectFromModel(get_selection_estimator(config.estimator, config.random_state), threshold=config.threshold,
+                                   max_features=config.n_features)
+        case 'univariate':
+            # mutual information is estimated from nearest neighbours of jittered data, seeded so that selection is reproducible
+            score_func = {'f_regression': f_regression,
+                          'mutual_info_regression': partial(mutual_info_regression, random_state=config.random_state)}[config.score_func]
+            if config.n_features is not None:
+                return SelectKBest(score_func, k=config.n_features)
+            return SelectPercentile(score_func, percentile=config.percentile)
+        case 'none':
+            return None
+        case other:
+            raise ValueError(f'Unknown feature selection method: {other}.')
+
+
+def fit_feature_selector(selector, X, y) -> float:
+    """
+    Fits feature selector and reports its fit time and number of selected features.
+
+    :param selector: feature selector exposing get_support().
+    :param X: transformed training features.
+    :param y: training target.
+    :return: fit time in seconds.
+    """
+    start = time.perf_counter()
+    selector.fit(X, y)
+    fit_time = time.perf_counter() - start
+
+    support = selector.get_support()
+    logger.info(f"Feature selection {type(selector).__name__} fitted in {fit_time:.3f} s, "
+                f"selected {support.sum()} of {len(support)} features.")
+    return fit_time
@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+import pandas as pd
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from mlengine.common.logger import logger
+from mlengine.common.metrics import Histogram, registry
+from mlengine.models.predict import Prediction
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_WAIT_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25]
+
+
+@dataclass
+class _PendingRequest:
+    features: pd.DataFrame
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent prediction requests into one matrix before calling Prediction.predict.
+
+    The first queued request opens a window of max_wait_ms; requests arriving within that window are scored together
+    (up to max_batch_size rows), and each caller receives only its own slice of the results.
+    Batch sizes and time spent waiting in the queue are recorded in histograms registered in the metrics registry.
+    """
+
+    def __init__(self, prediction: Prediction, max_wait_ms: float, max_batch_size: int):
+        self.prediction = prediction
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.batch_size_histogram = registry.register(
+            Histogram('prediction_batch_size', 'Number of rows scored in one coalesced batch.', BATCH_SIZE_BUCKETS))
+        self.queue_wait_histogram = registry.register(
+            Histogram('prediction_queue_wait_seconds', 'Time a request spent queued before being scored.', QUEUE_WAIT_BUCKETS))
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self) -> 'PredictionBatcher':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='PredictionBatcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, features: pd.DataFrame) -> Future:
+        """
+        Queues features for scoring.
+
+        :param features: DataFrame with one or more records (e.g. from CustomData.get_data_as_data_frame).
+        :return: Future resolved with predictions for the passed records.
+        """
+        request = _PendingRequest(features=features)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, features: pd.DataFrame):
+        return self.submit(features).result()
+
+    def stats(self) -> dict:
+        return {
+            self.batch_size_histogram.name: self.batch_size_histogram.snapshot(),
+            self.queue_wait_histogram.name: self.queue_wait_histogram.snapshot(),
+        }
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            batch = [request]
+            num_rows = len(request.features)
+            deadline = request.enqueued + self.max_wait
+
+            while num_rows < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)  # finish current batch first, stop on the next loop
+                    break
+                batch.append(request)
+                num_rows += len(request.features)
+
+            self._score(batch, num_rows)
+
+    def _score(self, batch: list, num_rows: int):
+        now = time.monotonic()
+        for request in batch:
+            self.queue_wait_histogram.observe(now - request.enqueued)
+        self.batch_size_histogram.observe(num_rows)
+
+        try:
+            results = self.prediction.predict(pd.concat([request.features for request in batch], ignore_index=True))
+        except Exception as e:
+            logger.warning(f"Scoring of coalesced batch failed ({e}), scoring {len(batch)} requests one by one.")
+            for request in batch:
+                try:
+                    request.future.set_result(self.prediction.predict(request.features))
+                except Exception as request_error:
+                    request.future.set_exception(request_error)
+            return
+
+        offset = 0
+        for request in batch:
+            request.future.set_result(results[offset:offset + len(request.features)])
+            offset += len(request.features)
@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+
+from mlengine.common.metrics import Counter, registry
+from mlengine.features.compiled import get_feature_columns
+
+
+class PredictionCache:
+    """
+    Size-bounded LRU cache of predictions keyed on the model version and normalized feature values.
+
+    Numerical features are normalized to floats and categorical ones to strings, so e.g. a form value '72' and a JSON
+    value 72 share an entry. When a different model version is seen, all entries of the previous one are dropped.
+    """
+
+    def __init__(self, max_size: int, num_features: list, cat_features: list):
+        self.max_size = max_size
+        self.num_features = list(num_features)
+        self.cat_features = list(cat_features)
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = registry.register(Counter('prediction_cache_hits_total', 'Predictions served from the cache.'))
+        self.misses = registry.register(Counter('prediction_cache_misses_total', 'Predictions not found in the cache.'))
+        self.evictions = registry.register(Counter('prediction_cache_evictions_total', 'Cache entries evicted to respect the size bound.'))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def make_keys(self, features) -> list:
+        """
+        Builds normalized cache keys.
+
+        :param features: list of dicts, NumPy record array or DataFrame with the raw features.
+        :return: list of keys, one per record.
+        """
+        columns = get_feature_columns(features, self.num_features + self.cat_features)
+        num_columns = [[float(value) for value in column] for column in columns[:len(self.num_features)]]
+        cat_columns = [[str(value) for value in column] for column in columns[len(self.num_features):]]
+        return list(zip(*num_columns, *cat_columns))
+
+    def get_many(self, version: str, keys: list) -> list:
+        """
+        Looks up predictions, marking found entries as recently used.
+
+        :param version: version of the model that would score the records.
+        :param keys: keys built with make_keys.
+        :return: list with cached prediction or None for every key.
+        """
+        results = []
+        with self._lock:
+            self._check_version(version)
+            for key in keys:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                results.append(result)
+        hits = sum(result is not None for result in results)
+        self.hits.inc(hits)
+        self.misses.inc(len(results) - hits)
+        return results
+
+    def put_many(self, version: str, keys: list, values) -> None:
+        with self._lock:
+            self._check_version(version)
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.evictions.inc(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits.value, "misses": self.misses.value, "evictions": self.evictions.value}
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
@@ -2,14 +2,56 @@ import numpy as np
 import os
 from box import ConfigBox
 from pathlib import Path
-import joblib
 import json
 
 from sklearn.svm import SVR
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 
+from mlengine.common.artifacts import artifact_store
 from mlengine.common.exceptions import MissingCriticalFileException
-from mlengine.data_read.read import read_csv_file
+from mlengine.common.utils import load_joblib_file
+from mlengine.config.settings import settings
+from mlengine.data_read.read import read_data_file, read_data_files_chunks
+from mlengine.features.cache import get_transformed_data
+
+
+class RunningRegressionMetrics:
+    """
+    MAE, RMSE and R2 accumulated chunk by chunk from running sums, so that memory use does not depend on the number
+    of rows. The target's sum of squared deviations is merged with Chan's parallel update instead of being computed
+    as sum(y^2) - n * mean^2, which loses precision on large sums.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.absolute_error = 0.0
+        self.squared_error = 0.0
+        self.mean = 0.0
+        self.squared_deviation = 0.0
+
+    def update(self, y_true, y_pred) -> None:
+        y_true = np.asarray(y_true, dtype=np.float64).ravel()
+        errors = y_true - np.asarray(y_pred, dtype=np.float64).ravel()
+        n = len(y_true)
+        if not n:
+            return
+        self.absolute_error += np.abs(errors).sum()
+        self.squared_error += errors @ errors
+
+        mean = y_true.mean()
+        delta, total = mean - self.mean, self.n + n
+        self.squared_deviation += ((y_true - mean) ** 2).sum() + delta ** 2 * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+
+    def compute(self) -> tuple:
+        """
+        :return: tuple of MAE, RMSE and R2, in the order of ModelEvaluator.evaluate_regression_model.
+        """
+        mae = self.absolute_error / self.n
+        rmse = np.sqrt(self.squared_error / self.n)
+        r2_square = 1 - self.squared_error / self.squared_deviation if self.squared_deviation else float('nan')
+        return mae, rmse, r2_square
 
 
 class ModelEvaluator():
@@ -18,23 +60,35 @@ class ModelEvaluator():
         self.X_file: Path = self.config.req_files[0]
         self.y_file: Path = self.config.req_files[1]
         self.preprocessing_pipeline_path: Path = self.config.req_files[2]
-        self.models = None
+        self.model_files = None
         self.X = None
         self.y = None
 
     def load_models(self):
+        """
+        Lists models to be evaluated. Models are loaded one at a time when they are scored (see load_model),
+        so that memory holds a single model rather than all of them.
+        """
+        artifact_store.wait([self.config.models_dir])  # models trained in this run may still be being written
         model_files = os.listdir(self.config.models_dir)
         if not model_files:
             raise MissingCriticalFileException('VLD_EX_002', 'No models to load from directory. Make sure the directory is correct and previous pipelines work without any issues.')
-        self.models = {Path(model_file).stem: joblib.load(os.path.join(self.config.models_dir, model_file)) for model_file in model_files}
+        self.model_files = {Path(model_file).stem: os.path.join(self.config.models_dir, model_file) for model_file in model_files}
+
+    def load_model(self, name: str):
+        """
+        Loads model. With mmap_models set, its arrays are memory-mapped read-only (sharing pages with other processes
+        loading the same file) and the artifact store does not keep it in memory after scoring.
+        """
+        mmap_models = settings.artifact_store.mmap_models
+        return load_joblib_file(self.model_files[name], mmap_mode='r' if mmap_models else None, keep=not mmap_models)
 
     def load_data_files(self):
-        self.X = read_csv_file(self.X_file)
-        self.y = read_csv_file(self.y_file).squeeze()
+        self.X = read_data_file(self.X_file)
+        self.y = read_data_file(self.y_file).squeeze()
 
     def preprocess_data(self):
-        preprocessing_pipeline = joblib.load(self.preprocessing_pipeline_path)
-        self.X = preprocessing_pipeline.transform(self.X)
+        self.X = get_transformed_data(self.preprocessing_pipeline_path, self.X_file, self.X)
 
     def evaluate_regression_model(self, y_true, y_pred):
         mae = mean_absolute_error(y_true, y_pred)
@@ -46,11 +100,41 @@ class ModelEvaluator():
     def save_regression_evaluation(self):
         all_metrics = {}
 
-        for name, model in self.models.items():
+        for name in self.model_files:
+            model = self.load_model(name)
             y_pred = model.predict(self.X)
+            del model  # released before the next model is loaded
             mae, rmse, r2 = self.evaluate_regression_model(self.y, y_pred)
             model_metrics = {"RMSE": rmse, "MAE": mae, "R2": r2}
             all_metrics[name] = model_metrics
 
+        self.save_metrics(all_metrics)
+
+    def save_regression_evaluation_streaming(self, chunksize: int):
+        """
+        Evaluates models chunk by chunk, instead of loading and preprocessing the whole data. The data is streamed
+        and preprocessed once, and every chunk is scored by all models. Each model is loaded once for the whole pass
+        (memory-mapped with mmap_models set), as loading it again for every chunk costs a full unpickling, e.g. tree
+        models copy their node arrays even when memory-mapped.
+
+        :param chunksize: number of rows per chunk.
+        """
+        preprocessing_pipeline = load_joblib_file(self.preprocessing_pipeline_path)
+        models = {name: self.load_model(name) for name in self.model_files}
+        metrics = {name: RunningRegressionMetrics() for name in self.model_files}
+
+        for X, y in read_data_files_chunks([self.X_file, self.y_file], chunksize):
+            X, y = preprocessing_pipeline.transform(X), y.to_numpy()
+            for name, model in models.items():
+                metrics[name].update(y, model.predict(X))
+        del models
+
+        all_metrics = {}
+        for name, model_metrics in metrics.items():
+            mae, rmse, r2 = model_metrics.compute()
+            all_metrics[name] = {"RMSE": rmse, "MAE": mae, "R2": r2}
+        self.save_metrics(all_metrics)
+
+    def save_metrics(self, all_metrics: dict):
         with open(os.path.join(self.config.root_dir, self.config.metrics_file), "w") as file:
             json.dump(all_metrics, file, indent=4)
@@ -0,0 +1,163 @@
+import json
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+from pathlib import Path
+
+from mlengine.common.exceptions import UnknownCategoryException
+from mlengine.common.utils import write_file_atomic
+from mlengine.features.compiled import CompiledPreprocessor, get_feature_columns
+
+
+def get_final_estimator(model):
+    return model.steps[-1][1] if hasattr(model, 'steps') else model
+
+
+def is_linear_model(model) -> bool:
+    """
+    Checks whether the (possibly pipelined) model is a single-target linear regressor that can be folded into a table.
+
+    :param model: fitted estimator or sklearn Pipeline ending with one.
+    :return: bool
+    """
+    from sklearn.linear_model import LinearRegression, Ridge, Lasso, ElasticNet, SGDRegressor
+
+    estimator = get_final_estimator(model)
+    return isinstance(estimator, (LinearRegression, Ridge, Lasso, ElasticNet, SGDRegressor)) and np.ndim(estimator.coef_) == 1
+
+
+class LinearTableScorer:
+    """
+    Linear model folded together with its preprocessing pipeline.
+
+    Standard scaling, one-hot encoding, feature selection and model coefficients collapse into one intercept,
+    one weight per numerical field and one contribution table per categorical field, so a record is scored with a
+    handful of dict lookups and multiply-adds, and a batch with one gather per categorical field and one dot product.
+    """
+
+    def __init__(self, intercept: float, num_features: list, num_weights: list, num_fill: list,
+                 cat_features: list, cat_tables: list, cat_fill: list):
+        self.intercept = float(intercept)
+        self.num_features = list(num_features)
+        self.num_weights = np.asarray(num_weights, dtype=np.float64)
+        self.num_fill = np.asarray(num_fill, dtype=np.float64)
+        self.cat_features = list(cat_features)
+        self.cat_tables = [dict(table) for table in cat_tables]
+        self.cat_fill = list(cat_fill)
+        self._cat_index = [{category: i for i, category in enumerate(table)} for table in self.cat_tables]
+        self._cat_contributions = [np.fromiter(table.values(), dtype=np.float64, count=len(table)) for table in self.cat_tables]
+
+    @classmethod
+    def from_model(cls, model, preprocessor) -> 'LinearTableScorer':
+        """
+        Folds fitted linear model and its fitted preprocessing pipeline into a lookup table scorer.
+
+        :param model: fitted linear regressor (or sklearn Pipeline ending with one).
+        :param preprocessor: fitted preprocessing pipeline the model was trained on.
+        :raises ValueError: if the model is not linear or the pipeline cannot be compiled.
+        :return: LinearTableScorer object.
+        """
+        if not is_linear_model(model):
+            raise ValueError(f'{type(get_final_estimator(model)).__name__} is not a supported linear model.')
+        estimator = get_final_estimator(model)
+        compiled = CompiledPreprocessor.from_pipeline(preprocessor)
+        coef = np.asarray(estimator.coef_, dtype=np.float64)
+
+        intercept = float(np.ravel(estimator.intercept_)[0])
+        num_weights = np.zeros(len(compiled.num_features))
+        for j, column in enumerate(compiled.num_columns):
+            if column >= 0:
+                num_weights[j] = coef[column] / compiled.num_scale[j]
+                intercept -= num_weights[j] * compiled.num_mean[j]
+
+        cat_tables = [{category: float(coef[column]) if column >= 0 else 0.0 for category, column in table.items()}
+                      for table in compiled.cat_tables]
+
+        return cls(intercept=intercept, num_features=compiled.num_features, num_weights=num_weights, num_fill=compiled.num_fill,
+                   cat_features=compiled.cat_features, cat_tables=cat_tables, cat_fill=compiled.cat_fill)
+
+    def predict_one(self, record: Mapping) -> float:
+        result = self.intercept
+        for name, weight, fill in zip(self.num_features, self.num_weights, self.num_fill):
+            value = float(record[name])
+            result += weight * (fill if value != value else value)
+        for name, table, fill in zip(self.cat_features, self.cat_tables, self.cat_fill):
+            value = record[name]
+            try:
+                result += table[fill if value != value else value]
+            except KeyError:
+                raise UnknownCategoryException('PRD_EX_004', f'Found unknown category {value!r} in column {name} during transform.')
+        return result
+
+    def predict(self, features) -> np.ndarray:
+        """
+        Scores records.
+
+        :param features: dict, list of dicts, NumPy record array or DataFrame with the raw features.
+        :raises UnknownCategoryException: if a categorical value was not seen during fitting.
+        :return: np.ndarray with one prediction per record.
+        """
+        if isinstance(features, Mapping):
+            return np.array([self.predict_one(features)])
+
+        columns = get_feature_columns(features, self.num_features + self.cat_features)
+        n_rows = len(columns[0]) if columns else 0
+        result = np.full(n_rows, self.intercept)
+
+        if self.num_features:
+            values = np.column_stack([np.asarray(column, dtype=np.float64) for column in columns[:len(self.num_features)]])
+            values = np.where(np.isnan(values), self.num_fill, values)
+            result += values @ self.num_weights
+
+        for i, name in enumerate(self.cat_features):
+            index, fill = self._cat_index[i], self.cat_fill[i]
+            try:
+                codes = np.fromiter((index[fill if value != value else value] for value in columns[len(self.num_features) + i]), dtype=np.intp, count=n_rows)
+            except KeyError as e:
+                raise UnknownCategoryException('PRD_EX_004', f'Found unknown category {e} in column {name} during transform.')
+            result += self._cat_contributions[i][codes]
+
+        return result
+
+    def check_parity(self, model, preprocessor, records: list | None = None) -> bool:
+        """
+        Checks that the table returns the same predictions as the model applied to preprocessed features
+        (up to floating point error introduced by folding).
+
+        :param model: fitted model the table should correspond to.
+        :param preprocessor: fitted preprocessing pipeline.
+        :param records: list of dicts to score, defaults to probe records covering every known category.
+        :return: bool
+        """
+        if records is None:
+            records = CompiledPreprocessor.from_pipeline(preprocessor).probe_records()
+        expected = model.predict(preprocessor.transform(pd.DataFrame(records)))
+        return bool(np.allclose(expected, self.predict(records), rtol=1e-9, atol=1e-9))
+
+    def to_dict(self) -> dict:
+        return {
+            "intercept": self.intercept,
+            "numerical": {name: {"weight": float(weight), "fill": float(fill)}
+                          for name, weight, fill in zip(self.num_features, self.num_weights, self.num_fill)},
+            "categorical": {name: {"contributions": table, "fill": fill}
+                            for name, table, fill in zip(self.cat_features, self.cat_tables, self.cat_fill)},
+        }
+
+    @classmethod
+    def from_dict(cls, table: dict) -> 'LinearTableScorer':
+        numerical, categorical = table["numerical"], table["categorical"]
+        return cls(intercept=table["intercept"],
+                   num_features=list(numerical),
+                   num_weights=[field["weight"] for field in numerical.values()],
+                   num_fill=[field["fill"] for field in numerical.values()],
+                   cat_features=list(categorical),
+                   cat_tables=[field["contributions"] for field in categorical.values()],
+                   cat_fill=[field["fill"] for field in categorical.values()])
+
+    def save(self, path: Path) -> None:
+        write_file_atomic(path, lambda file: json.dump(self.to_dict(), file, indent=4), mode='w')
+
+    @classmethod
+    def load(cls, path: Path) -> 'LinearTableScorer':
+        with open(path, 'r') as file:
+            return cls.from_dict(json.load(file))
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import joblib
+from dataclasses import dataclass
+from typing import Any
+
+from mlengine.common.exceptions import MissingCriticalFileException
+from mlengine.common.logger import logger
+from mlengine.config.settings import settings, Singleton
+from mlengine.features.compiled import compile_preprocessing_pipeline
+from mlengine.models.export import LinearTableScorer
+
+
+@dataclass(frozen=True)
+class LoadedArtifacts:
+    model: Any
+    preprocessor: Any
+    version: str
+    compiled_preprocessor: Any = None
+    scorer: Any = None
+
+    @property
+    def fast_preprocessor(self):
+        return self.compiled_preprocessor if self.compiled_preprocessor is not None else self.preprocessor
+
+
+class ModelHolder(metaclass=Singleton):
+    """
+    Process-wide, thread-safe holder of the serving model and its preprocessing pipeline.
+
+    Both artifacts are unpickled once and shared by every request. The model testing stage publishes the preprocessor
+    next to the model, and the model file is the last artifact it writes, so it is watched (by mtime or content hash,
+    at most once per reload interval) and a change triggers reloading of both files. The model holds the hash of the
+    preprocessor published with it, and a pair that does not match is refused. The new pair replaces the old one
+    in a single assignment, so a request always works with a consistent model/preprocessor pair and never waits
+    for a reload done by another thread.
+    """
+
+    def __init__(self):
+        self.model_path = os.path.join(settings.model_testing.root_dir, "model.pkl")
+        self.preprocessor_path = os.path.join(settings.model_testing.root_dir, settings.model_preprocessing.prep_pipeline_file)
+        # models published before the preprocessor was published with them are served with the preprocessing stage's one
+        self.legacy_preprocessor_path = os.path.join(settings.model_preprocessing.root_dir, settings.model_preprocessing.prep_pipeline_file)
+        self.reload_interval: float = settings.prediction.reload_interval
+        self.reload_check: str = settings.prediction.reload_check
+        self.linear_table_path = os.path.join(settings.model_testing.root_dir, settings.model_testing.linear_table_file)
+        self.compile_preprocessor: bool = settings.prediction.compiled_preprocessor
+        self.use_linear_table: bool = settings.prediction.linear_table
+        self._lock = threading.Lock()
+        self._artifacts: LoadedArtifacts | None = None
+        self._signature = None
+        self._last_check = float('-inf')
+
+    @property
+    def version(self) -> str | None:
+        return self._artifacts.version if self._artifacts is not None else None
+
+    def get(self) -> LoadedArtifacts:
+        """
+        Returns currently loaded artifacts, checking for a new version if the reload interval has passed.
+
+        :return: LoadedArtifacts - model, preprocessor and version of the model.
+        """
+        artifacts = self._artifacts
+        if artifacts is None or time.monotonic() - self._last_check >= self.reload_interval:
+            artifacts = self.refresh()
+        return artifacts
+
+    def refresh(self, force: bool = False) -> LoadedArtifacts:
+        """
+        Reloads artifacts if the model file changed since the last load.
+        While artifacts are being reloaded, other threads keep using the previous version instead of waiting.
+
+        :param force: if True, artifacts are reloaded even if the model file has not changed.
+        :return: LoadedArtifacts - currently active artifacts.
+        """
+        if not self._lock.acquire(blocking=self._artifacts is None):
+            return self._artifacts
+
+        try:
+            self._last_check = time.monotonic()
+            try:
+                signature = self._get_signature()
+                if force or signature != self._signature:
+                    self._artifacts = self._load()
+                    self._signature = signature
+                    logger.info(f"Loaded model version {self._artifacts.version} from {self.model_path}.")
+            except Exception as e:
+                if self._artifacts is None:
+                    raise MissingCriticalFileException('PRD_EX_001', 'Model file or preprocessor file missing.') from e
+                logger.warning(f"Failed to reload artifacts, still serving model version {self._artifacts.version}: {e}")
+            return self._artifacts
+        finally:
+            self._lock.release()
+
+    def _get_signature(self):
+        if self.reload_check == 'hash':
+            with open(self.model_path, 'rb') as file:
+                return hashlib.sha256(file.read()).hexdigest()
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> LoadedArtifacts:
+        # model is read into memory first, so the version hash always describes exactly the object that was unpickled
+        with open(self.model_path, 'rb') as file:
+            model_bytes = file.read()
+        model = joblib.load(io.BytesIO(model_bytes))
+        preprocessor_sha256 = getattr(model, 'preprocessor_sha256_', None)
+        preprocessor_path = self.preprocessor_path if preprocessor_sha256 is not None else self.legacy_preprocessor_path
+        with open(preprocessor_path, 'rb') as file:
+            preprocessor_bytes = file.read()
+        if preprocessor_sha256 is not None and hashlib.sha256(preprocessor_bytes).hexdigest() != preprocessor_sha256:
+            raise ValueError(f"Preprocessor {preprocessor_path} was not published together with model {self.model_path}.")
+        preprocessor = joblib.load(io.BytesIO(preprocessor_bytes))
+        compiled_preprocessor = None
+        if self.compile_preprocessor:
+            try:
+                compiled_preprocessor = compile_preprocessing_pipeline(preprocessor)
+            except ValueError as e:
+                logger.warning(f"Preprocessing pipeline could not be compiled, falling back to sklearn transform: {e}")
+        return LoadedArtifacts(model=model, preprocessor=preprocessor, version=hashlib.sha256(model_bytes).hexdigest()[:12],
+                               compiled_preprocessor=compiled_preprocessor, scorer=self._load_scorer(model, preprocessor))
+
+    def _load_scorer(self, model, preprocessor) -> LinearTableScorer | None:
+        if not self.use_linear_table or not os.path.exists(self.linear_table_path):
+            return None
+        try:
+            scorer = LinearTableScorer.load(self.linear_table_path)
+            if scorer.check_parity(model, preprocessor):
+                return scorer
+            logger.warning(f"Linear table {self.linear_table_path} does not match the loaded model, ignoring it.")
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Linear table {self.linear_table_path} could not be loaded: {e}")
+        return None
@@ -1,15 +1,23 @@
+import hashlib
 import os
 from box import ConfigBox
 from pathlib import Path
-import joblib
 import json
 
+from mlengine.common.artifacts import artifact_store
+from mlengine.common.logger import logger
+from mlengine.common.utils import save_joblib_file, load_joblib_file, write_file_atomic
+from mlengine.models.export import LinearTableScorer, is_linear_model
+
 
 class ModelPicker():
     def __init__(self, config: ConfigBox):
         self.config: ConfigBox = config
         self.test_metrics_file = Path(os.path.join(self.config.model_testing.root_dir, self.config.model_testing.metrics_file))
         self.selected_metric = config.model_testing.selected_test_metric
+        self.linear_table_file = Path(os.path.join(self.config.model_testing.root_dir, self.config.model_testing.linear_table_file))
+        self.preprocessing_pipeline_file = Path(os.path.join(self.config.model_preprocessing.root_dir, self.config.model_preprocessing.prep_pipeline_file))
+        self.published_preprocessing_pipeline_file = Path(os.path.join(self.config.model_testing.root_dir, self.config.model_preprocessing.prep_pipeline_file))
         self.best_model_name = None
 
     def pick_best_model(self):
@@ -19,5 +27,38 @@ class ModelPicker():
         self.best_model_name = max(test_metrics, key=lambda model: test_metrics[model].get(self.selected_metric, float('-inf')))
 
     def save_best_model(self):
-        best_model = joblib.load(os.path.join(self.config.model_training.models_dir, self.best_model_name + ".pkl"))
-        joblib.dump(best_model, os.path.join(self.config.model_testing.root_dir, "model.pkl"))
+        best_model = load_joblib_file(os.path.join(self.config.model_training.models_dir, self.best_model_name + ".pkl"))
+        # written before model.pkl, which marks a complete set of serving artifacts
+        best_model.preprocessor_sha256_ = self.publish_preprocessor()
+        self.export_linear_table(best_model)
+        save_joblib_file(best_model, os.path.join(self.config.model_testing.root_dir, "model.pkl"))
+
+    def publish_preprocessor(self) -> str:
+        """
+        Copies the preprocessing pipeline next to model.pkl, so that serving replaces both together, rather than
+        picking up a new pipeline as soon as the preprocessing stage writes it, paired with the previous model.
+
+        :return: sha256 of the published pipeline, stored in the model to check the pair when it is loaded.
+        """
+        artifact_store.wait([self.preprocessing_pipeline_file])
+        with open(self.preprocessing_pipeline_file, 'rb') as file:
+            content = file.read()
+        write_file_atomic(self.published_preprocessing_pipeline_file, lambda file: file.write(content))
+        return hashlib.sha256(content).hexdigest()
+
+    def export_linear_table(self, best_model):
+        """
+        Folds the best model together with the preprocessing pipeline into a lookup table scorer if the model is linear.
+        A table left over from a previous linear winner is removed otherwise.
+        """
+        if is_linear_model(best_model):
+            try:
+                scorer = LinearTableScorer.from_model(best_model, load_joblib_file(self.preprocessing_pipeline_file))
+                scorer.save(self.linear_table_file)
+                logger.info(f"Linear model {self.best_model_name} exported as lookup table to {self.linear_table_file}.")
+                return
+            except ValueError as e:
+                logger.warning(f"Linear model {self.best_model_name} could not be exported as lookup table: {e}")
+
+        if os.path.exists(self.linear_table_file):
+            os.remove(self.linear_table_file)
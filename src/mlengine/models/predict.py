@@ -1,30 +1,87 @@
-import sys
+import io
+import re
+import numpy as np
 import pandas as pd
-import os
-import joblib
+from collections.abc import Mapping
 
-from mlengine.common.exceptions import MissingCriticalFileException
+from mlengine.common.exceptions import InvalidInputException, UnknownCategoryException
+from mlengine.common.metrics import stage_timer
 from mlengine.config.settings import settings
-from dataclasses import dataclass, asdict
+from mlengine.models.cache import PredictionCache
+from mlengine.models.holder import ModelHolder
+from dataclasses import dataclass, asdict, fields
 
 
 class Prediction:
     def __init__(self):
-        pass
+        self.model_holder = ModelHolder()
+        self.cache = None
+        if settings.prediction.cache_size:
+            num_features = [field.name for field in fields(CustomData) if field.type is int]
+            cat_features = [field.name for field in fields(CustomData) if field.type is str]
+            self.cache = PredictionCache(settings.prediction.cache_size, num_features=num_features, cat_features=cat_features)
+
+    @property
+    def model_version(self) -> str | None:
+        return self.model_holder.version
 
     def predict(self, features):
-        preprocessor_path = os.path.join(settings.model_preprocessing.root_dir, settings.model_preprocessing.prep_pipeline_file)
-        model_path = os.path.join(settings.model_testing.root_dir, "model.pkl")
+        with stage_timer('artifact_loading'):
+            artifacts = self.model_holder.get()
 
-        try:
-            model = joblib.load(model_path)
-            preprocessor = joblib.load(preprocessor_path)
-        except Exception as e:
-            raise MissingCriticalFileException('PRD_EX_001', 'Model file or preprocessor file missing.')  # todo: move to utils
+        if self.cache is None:
+            return self._predict(artifacts, features)
+
+        if isinstance(features, Mapping):
+            features = [features]
+        keys = self.cache.make_keys(features)
+        cached = self.cache.get_many(artifacts.version, keys)
+        missing = [i for i, result in enumerate(cached) if result is None]
+        if not missing:
+            return np.array(cached)
+
+        if len(missing) < len(keys):
+            features = features.iloc[missing] if isinstance(features, pd.DataFrame) else [features[i] for i in missing]
+        results = self._predict(artifacts, features)
+        self.cache.put_many(artifacts.version, [keys[i] for i in missing], results)
+
+        for i, result in zip(missing, results):
+            cached[i] = result
+        return np.array(cached)
+
+    @staticmethod
+    def _predict(artifacts, features):
+        if artifacts.scorer is not None:
+            with stage_timer('linear_table'):
+                return artifacts.scorer.predict(features)
+
+        with stage_timer('transform'):
+            try:
+                data_scaled = artifacts.fast_preprocessor.transform(features)
+            except ValueError as e:
+                if isinstance(e, UnknownCategoryException) or 'unknown categor' not in str(e):
+                    raise
+                # raised by the sklearn OneHotEncoder, when the pipeline could not be compiled
+                raise UnknownCategoryException('PRD_EX_004', get_unknown_category_message(artifacts.fast_preprocessor, e)) from e
 
-        data_scaled = preprocessor.transform(features)
+        with stage_timer('predict'):
+            return artifacts.model.predict(data_scaled)
 
-        return model.predict(data_scaled)
+
+def get_unknown_category_message(pipeline, error: ValueError) -> str:
+    """
+    Returns message of an unknown category error raised by the sklearn OneHotEncoder, with the index of the column
+    within the encoded block replaced by the column name.
+
+    :param pipeline: preprocessing pipeline, starting with a ColumnTransformer.
+    :param error: error raised by its transform.
+    """
+    match = re.search(r'in column (\d+)', str(error))
+    encoded = [columns for _, transformer, columns in pipeline.steps[0][1].transformers_
+               if any(type(step).__name__ == 'OneHotEncoder' for step in getattr(transformer, 'named_steps', {}).values())]
+    if match is None or len(encoded) != 1 or int(match.group(1)) >= len(encoded[0]):
+        return str(error)
+    return str(error).replace(match.group(0), f'in column {list(encoded[0])[int(match.group(1))]}')
 
 
 @dataclass
@@ -37,6 +94,97 @@ class CustomData:
     reading_score: int
     writing_score: int
 
+    @classmethod
+    def from_form(cls, form) -> 'CustomData':
+        """
+        Creates CustomData from submitted prediction form.
+
+        :param form: mapping of form fields (e.g. request.form).
+        :return: CustomData object.
+        """
+        return cls(**{field.name: field.type(form.get(field.name)) for field in fields(cls)})
+
     def get_data_as_data_frame(self):
         data_dict = {k: str(v) for k, v in asdict(self).items()}
         return pd.DataFrame([data_dict])  # wrapping dictionary into a list to avoid having to pass index
+
+
+class CustomDataBatch:
+    """
+    Batch of CustomData records validated column by column, so that a whole batch is checked
+    and turned into a single DataFrame in one pass instead of one DataFrame per record.
+    """
+
+    def __init__(self, df: pd.DataFrame, max_batch_size: int | None = None):
+        self.max_batch_size = max_batch_size if max_batch_size is not None else settings.prediction.max_batch_size
+        self.df = self._validate(df)
+
+    @classmethod
+    def from_records(cls, records, max_batch_size: int | None = None) -> 'CustomDataBatch':
+        """
+        Creates batch from a list of dictionaries (e.g. parsed JSON body).
+
+        :param records: list of dicts with CustomData fields.
+        :param max_batch_size: maximum number of records accepted, defaults to prediction.max_batch_size setting.
+        :return: CustomDataBatch object.
+        """
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise InvalidInputException('PRD_EX_002', 'Batch must be a list of objects.')
+        return cls(pd.DataFrame.from_records(records), max_batch_size=max_batch_size)
+
+    @classmethod
+    def from_payload(cls, payload, max_batch_size: int | None = None) -> 'CustomDataBatch':
+        """
+        Creates batch from parsed JSON body, either a list of records or an object with the list under 'records' key.
+
+        :param payload: parsed JSON body.
+        :param max_batch_size: maximum number of records accepted, defaults to prediction.max_batch_size setting.
+        :return: CustomDataBatch object.
+        """
+        records = payload.get('records') if isinstance(payload, dict) else payload
+        return cls.from_records(records, max_batch_size=max_batch_size)
+
+    @classmethod
+    def from_csv(cls, text: str, max_batch_size: int | None = None) -> 'CustomDataBatch':
+        """
+        Creates batch from CSV text with a header row containing CustomData fields.
+
+        :param text: CSV content.
+        :param max_batch_size: maximum number of records accepted, defaults to prediction.max_batch_size setting.
+        :return: CustomDataBatch object.
+        """
+        try:
+            df = pd.read_csv(io.StringIO(text), delimiter=',')
+        except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            raise InvalidInputException('PRD_EX_002', f'Malformed CSV: {e}')
+        return cls(df, max_batch_size=max_batch_size)
+
+    def __len__(self):
+        return len(self.df)
+
+    def get_data_as_data_frame(self) -> pd.DataFrame:
+        return self.df
+
+    def _validate(self, df: pd.DataFrame) -> pd.DataFrame:
+        if len(df) == 0:
+            raise InvalidInputException('PRD_EX_002', 'Batch is empty.')
+        if len(df) > self.max_batch_size:
+            raise InvalidInputException('PRD_EX_003', f'Batch of {len(df)} records exceeds maximum batch size of {self.max_batch_size}.')
+
+        expected = [field.name for field in fields(CustomData)]
+        missing = [name for name in expected if name not in df.columns]
+        unexpected = [name for name in df.columns if name not in expected]
+        if missing or unexpected:
+            raise InvalidInputException('PRD_EX_002', f'Missing fields: {missing}, unexpected fields: {unexpected}.')
+
+        for field in fields(CustomData):
+            column = df[field.name]
+            if field.type is str:
+                valid = pd.api.types.infer_dtype(column, skipna=False) == 'string'
+            else:
+                valid = pd.api.types.is_integer_dtype(column)
+            if not valid:
+                bad_rows = [i for i, value in enumerate(column) if not isinstance(value, field.type) or isinstance(value, bool)]
+                raise InvalidInputException('PRD_EX_002', f'Field {field.name} must be of type {field.type.__name__}, invalid records: {bad_rows[:10]}.')
+
+        return df[expected].reset_index(drop=True)
@@ -1,21 +1,53 @@
 from box import ConfigBox
+import numpy as np
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import joblib
 
 from sklearn.ensemble import RandomForestRegressor, AdaBoostRegressor
-from sklearn.linear_model import LinearRegression, Ridge, Lasso
+from sklearn.linear_model import LinearRegression, Ridge, Lasso, SGDRegressor
 from sklearn.neighbors import KNeighborsRegressor
+from sklearn.neural_network import MLPRegressor
 from sklearn.tree import DecisionTreeRegressor
 # from catboost import CatBoostRegressor
 # from xgboost import XGBRegressor
 
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import RandomizedSearchCV, GridSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables the halving searches import below)
+from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
 
+from mlengine.common.artifacts import artifact_store
 from mlengine.common.logger import logger
-from mlengine.data_read.read import read_csv_file
-from mlengine.common.utils import get_num_fits, setup_param_grid, read_yaml
+from mlengine.config.settings import settings
+from mlengine.data_read.read import read_data_file, read_data_files_chunks
+from mlengine.features.cache import get_transformed_data
+from mlengine.common.utils import (get_num_fits, setup_param_grid, setup_search, read_yaml, save_joblib_file, load_joblib_file,
+                                  allocate_cpu_budget, get_shared_array, get_shared_memory_dir)
+
+
+class CpuBudget:
+    """
+    Pool of CPU cores shared by concurrently trained models: a model holds as many cores as its search uses jobs.
+    """
+
+    def __init__(self, cores: int):
+        self.cores = cores
+        self._available = cores
+        self._condition = threading.Condition()
+
+    def acquire(self, cores: int) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._available >= cores)
+            self._available -= cores
+
+    def release(self, cores: int) -> None:
+        with self._condition:
+            self._available += cores
+            self._condition.notify_all()
 
 
 class ModelTrainer():
@@ -37,30 +69,134 @@ class ModelTrainer():
             # "CatBoostingRegressor": CatBoostRegressor(verbose=False),
             "AdaBoostRegressor": AdaBoostRegressor()
         }
-        self.models_params = read_yaml(Path('src/mlengine/config/params.yaml'))
+        # models trained in streaming mode, fitted incrementally with partial_fit
+        self.streaming_models = {
+            "SGDRegressor": SGDRegressor(penalty=None),
+            "SGDRidgeRegressor": SGDRegressor(penalty='l2'),
+            "SGDLassoRegressor": SGDRegressor(penalty='l1'),
+            # partial_fit makes a single pass over a chunk, so mini-batches are small and steps large
+            "MLPRegressor": MLPRegressor(batch_size=32, learning_rate_init=0.01),
+        }
+        self.models_params = read_yaml(Path(self.config.params_file))
+        self.cpu_budget = self.config.cpu_budget if self.config.cpu_budget > 0 else os.cpu_count()
+
+        for model in [*self.models.values(), *self.streaming_models.values()]:
+            if 'random_state' in model.get_params():
+                model.set_params(random_state=self.config.random_state)
 
         self.fit_best_models = []
 
+    def clear_models_dir(self):
+        """
+        Removes models saved by previous runs, so that evaluation and picking of the best model only see the models
+        trained by this one (e.g. not batch models left over after switching to streaming mode, or vice versa).
+        """
+        artifact_store.wait([self.config.models_dir])
+        for model_file in Path(self.config.models_dir).glob('*.pkl'):
+            model_file.unlink()
+
     def get_training_data(self):
-        self.X_train = read_csv_file(self.X_train_file)
-        self.y_train = read_csv_file(self.y_train_file).squeeze()
+        self.X_train = read_data_file(self.X_train_file)
+        self.y_train = read_data_file(self.y_train_file).squeeze()
 
     def preprocess_training_data(self):
-        preprocessing_pipeline = joblib.load(self.preprocessing_pipeline_path)
-        self.X_train = preprocessing_pipeline.transform(self.X_train)
+        self.X_train = get_transformed_data(self.preprocessing_pipeline_path, self.X_train_file, self.X_train)
 
     def train_models(self):
+        """
+        Trains models concurrently within the CPU budget. Each model's cross-validation gets a share of the budget
+        proportional to its number of fits, and models are started from the most expensive one.
+        Cross-validation workers of all searches read the training data from a single memory-mapped copy per run
+        (their fold copies are still private to each worker).
+        """
         model_pipelines = {name: Pipeline(steps=[(name, clf)]) for name, clf in self.models.items()}
+        param_grids = {name: setup_param_grid(self.models_params, name) for name in model_pipelines}
+        searches = {name: setup_search(self.models_params, name) for name in model_pipelines}
+        num_fits = {name: get_num_fits(param_grids[name], searches[name]['cv'], searches[name], len(self.y_train)) for name in model_pipelines}
+        n_jobs = allocate_cpu_budget(num_fits, self.cpu_budget)
+        budget = CpuBudget(self.cpu_budget)
+
+        def train(name):
+            budget.acquire(n_jobs[name])
+            try:
+                logger.info(f"Training {name} model ({searches[name]['type']} search, {num_fits[name]} fits, {n_jobs[name]} jobs)...")
+                self.train_model(name, model_pipelines[name], param_grids[name], searches[name], n_jobs[name])
+            finally:
+                budget.release(n_jobs[name])
+
+        order = sorted(model_pipelines, key=lambda name: n_jobs[name], reverse=True)
+        nbytes = sum(array.nbytes for array in (self.X_train, self.y_train) if isinstance(array, np.ndarray))
+        with tempfile.TemporaryDirectory(prefix='training-', dir=get_shared_memory_dir(nbytes)) as shared_dir:
+            if max(n_jobs.values()) > 1:
+                self.X_train = get_shared_array(self.X_train, os.path.join(shared_dir, 'X_train.npy'))
+                self.y_train = get_shared_array(self.y_train, os.path.join(shared_dir, 'y_train.npy'))
+            with ThreadPoolExecutor(max_workers=min(len(order), self.cpu_budget), thread_name_prefix='training') as executor:
+                for future in [executor.submit(train, name) for name in order]:
+                    future.result()
+
+    def get_search(self, model_pipeline: Pipeline, param_grid: dict, search: dict, n_jobs: int):
+        """
+        Returns hyper-parameter search object of the configured type.
+        Randomized searches sample n_iter candidates, halving searches promote the best 1/factor of candidates
+        to the next iteration, which gets factor times more of the resource (samples or e.g. number of estimators).
+        """
+        common = dict(cv=search['cv'], n_jobs=n_jobs, verbose=False)
+        halving = dict(factor=search['factor'], min_resources=search['min_resources'], max_resources=search['max_resources'],
+                       random_state=self.config.random_state, **common)
+        resource = search['resource']
+        if resource != 'n_samples':
+            resource = f"{model_pipeline.steps[-1][0]}__{resource}"  # parameter names of the model are prefixed in the pipeline
+
+        match search['type']:
+            case 'random':
+                return RandomizedSearchCV(model_pipeline, param_distributions=param_grid, n_iter=search['n_iter'],
+                                          random_state=self.config.random_state, **common)
+            case 'halving':
+                return HalvingGridSearchCV(model_pipeline, param_grid=param_grid, resource=resource, **halving)
+            case 'halving_random':
+                return HalvingRandomSearchCV(model_pipeline, param_distributions=param_grid, n_candidates=search['n_iter'],
+                                             resource=resource, **halving)
+            case _:
+                return GridSearchCV(model_pipeline, param_grid=param_grid, **common)
+
+    def train_model(self, name: str, model_pipeline: Pipeline, param_grid: dict, search: dict, n_jobs: int):
+        models = self.get_search(model_pipeline, param_grid, search, n_jobs)
+        best_model = models.fit(self.X_train, self.y_train).best_estimator_  # refit on full training data by the search (refit=True)
+
+        # memory-mapped models are loaded from disk for evaluation, rather than kept in memory for the rest of the run
+        save_joblib_file(best_model, os.path.join(self.config.models_dir, name + ".pkl"), keep=not settings.artifact_store.mmap_models)
+
+        logger.info(f"Training successful, model saved under '{name}.pkl'.")
 
-        for name, model_pipeline in model_pipelines.items():
-            logger.info(f"Training {name} model...")
+    def train_models_streaming(self, chunksize: int, epochs: int):
+        """
+        Trains models supporting partial_fit on chunks of the training data fed through the fitted preprocessing
+        pipeline, so that the training data never has to fit in memory. Each chunk is transformed once per epoch
+        and shared by all models. There is no hyper-parameter search, the models' default parameters from the
+        params file are used.
 
-            param_grid = setup_param_grid(self.models_params, name)
-            cv = self.models_params[name].cv if name in self.models_params else 5
-            models = GridSearchCV(model_pipeline, param_grid=param_grid, cv=cv, verbose=False)
-            best_model = models.fit(self.X_train, self.y_train).best_estimator_
-            best_model.fit(self.X_train, self.y_train)  # retrain the model again on full training data (previously we were 1 fold short for each iter of CV)
+        :param chunksize: number of rows per chunk.
+        :param epochs: number of passes over the training data.
+        """
+        for name, model in self.streaming_models.items():
+            model.set_params(**(self.models_params.get(name, {}).get('default') or {}))
+        preprocessing_pipeline = load_joblib_file(self.preprocessing_pipeline_path)
+        random_state = np.random.RandomState(self.config.random_state)
 
-            joblib.dump(best_model, os.path.join(self.config.models_dir, name + ".pkl"))
+        for epoch in range(epochs):
+            start, n_rows = time.perf_counter(), 0
+            for X, y in read_data_files_chunks([self.X_train_file, self.y_train_file], chunksize):
+                order = random_state.permutation(len(X))  # rows of a chunk are shuffled, as SGD expects
+                X = preprocessing_pipeline.transform(X)[order]
+                y = y.to_numpy().ravel()[order]
+                for model in self.streaming_models.values():
+                    model.partial_fit(X, y)
+                n_rows += len(y)
+            logger.info(f"Epoch {epoch + 1} of {epochs}: {len(self.streaming_models)} models fitted on {n_rows} rows "
+                        f"in {time.perf_counter() - start:.3f} s.")
 
+        for name, model in self.streaming_models.items():
+            # saved in a pipeline, the same way as models trained by a search
+            save_joblib_file(Pipeline(steps=[(name, model)]), os.path.join(self.config.models_dir, name + ".pkl"),
+                             keep=not settings.artifact_store.mmap_models)
             logger.info(f"Training successful, model saved under '{name}.pkl'.")
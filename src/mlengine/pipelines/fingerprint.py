@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+from functools import cache
+from pathlib import Path
+
+from mlengine.common.artifacts import artifact_store
+from mlengine.common.utils import create_directories, write_file_atomic, get_path_hash
+
+
+@cache
+def get_code_version() -> str:
+    """
+    Returns hash of the mlengine package sources, so that changes of code invalidate fingerprints of all pipelines.
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for root, _, names in sorted(os.walk(package_dir)):
+        for name in sorted(names):
+            if name.endswith('.py'):
+                file = os.path.join(root, name)
+                digest.update(os.path.relpath(file, package_dir).encode())
+                with open(file, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def compute_fingerprint(pipeline) -> str:
+    """
+    Returns fingerprint of a pipeline run: hash of its inputs' contents, the settings it depends on and the code version.
+
+    :param pipeline: object fitting the Pipeline interface.
+    :return: hex digest.
+    """
+    from mlengine.data_read.read import resolve_data_file
+
+    inputs = {str(path): resolve_data_file(path) for path in pipeline.inputs()}
+    artifact_store.wait(list(inputs.values()))  # inputs produced earlier in the run are hashed once they are on disk
+    content = {
+        "inputs": {path: get_path_hash(data_file) for path, data_file in inputs.items()},
+        "config": {name: section.model_dump(mode='json') if hasattr(section, 'model_dump') else section
+                   for name, section in pipeline.config().items()},
+        "code": get_code_version(),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Fingerprints of the last successful run of each pipeline, stored as one JSON file per pipeline.
+    """
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = root_dir
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root_dir, f'{name}.json')
+
+    def get(self, name: str) -> str | None:
+        try:
+            with open(self._path(name)) as file:
+                return json.load(file).get('fingerprint')
+        except (OSError, ValueError):
+            return None
+
+    def put(self, name: str, fingerprint: str) -> None:
+        create_directories([self.root_dir], verbose=False)
+        write_file_atomic(self._path(name), lambda file: json.dump({"fingerprint": fingerprint}, file), mode='w')
+
+    def remove(self, name: str) -> None:
+        if os.path.exists(self._path(name)):
+            os.remove(self._path(name))
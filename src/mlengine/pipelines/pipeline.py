@@ -1,16 +1,13 @@
 import abc
+import os
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from mlengine.config.settings import settings
 from mlengine.common.logger import logger
-from mlengine.data_read.read import DataIngestion
-from mlengine.common.utils import create_directories
-from mlengine.dataops.validate import FileValidator, StudentDataValidator, StudentTransformedDataValidator
-from mlengine.dataops.transform import StudentDataTransformer
-from mlengine.dataops.split import DataSplitter
-from mlengine.features.prep import Preprocessor
-from mlengine.models.train import ModelTrainer
-from mlengine.models.evaluate import ModelEvaluator
-from mlengine.models.pick import ModelPicker
+from mlengine.common.artifacts import artifact_store
+from mlengine.common.exceptions import PipelineFailedException
+from mlengine.pipelines.fingerprint import FingerprintStore, compute_fingerprint
 
 
 class Pipeline(metaclass=abc.ABCMeta):
@@ -30,35 +27,115 @@ class Pipeline(metaclass=abc.ABCMeta):
         """Run the particular pipeline"""
         raise NotImplementedError
 
+    @staticmethod
+    def inputs() -> list:
+        """Files the pipeline reads, produced either by other pipelines or present beforehand"""
+        return []
+
+    @staticmethod
+    def outputs() -> list:
+        """Files and directories the pipeline produces"""
+        return []
+
+    @staticmethod
+    def config() -> dict:
+        """Settings sections (and parameters) the pipeline results depend on"""
+        return {}
+
+    @staticmethod
+    def outputs_valid() -> bool:
+        """Checks existing outputs beyond their presence, before the pipeline is skipped as up to date"""
+        return True
+
 
 class PipelineRunner:
     """
     Responsible for encapsulating running any pipeline that fits the Pipeline Interface flow
     """
 
-    def __init__(self, pipeline_object: Pipeline, stage_name: str):
+    def __init__(self, pipeline_object: Pipeline, stage_name: str, force: bool = False):
         self.pipeline_object = pipeline_object
         self.stage_name = stage_name
+        self.force = force
         self.__stage_marker = 5 * '='
         self.__separator = 30 * '*'
 
     def run_pipeline(self):
         try:
-            logger.info(f"{self.__stage_marker} {self.stage_name} started {self.__stage_marker}")
-            self.pipeline_object.run()
-            logger.info(f"{self.__stage_marker} {self.stage_name} completed {self.__stage_marker}\n{self.__separator}")
+            if not settings.incremental.enabled:
+                self._run()
+                return
+
+            store = FingerprintStore(settings.incremental.fingerprints_dir)
+            name = type(self.pipeline_object).__name__
+            fingerprint = compute_fingerprint(self.pipeline_object)
+            from mlengine.data_read.read import resolve_data_file
+
+            outputs = [resolve_data_file(output) for output in self.pipeline_object.outputs()]
+            outputs_exist = all(artifact_store.exists(output) for output in outputs)
+
+            if not self.force and outputs_exist and store.get(name) == fingerprint and self.pipeline_object.outputs_valid():
+                logger.info(f"{self.__stage_marker} {self.stage_name} skipped, up to date {self.__stage_marker}\n{self.__separator}")
+                return
+
+            store.remove(name)  # outputs of an interrupted run are never considered up to date
+            self._run()
+            # recorded only once the outputs are on disk, so a failed background write is not taken for up to date
+            outputs = [resolve_data_file(output) for output in self.pipeline_object.outputs()]
+            artifact_store.on_written(outputs, lambda: store.put(name, fingerprint))
         except Exception as e:
             logger.exception(e)
             raise e
 
+    def _run(self):
+        logger.info(f"{self.__stage_marker} {self.stage_name} started {self.__stage_marker}")
+        self.pipeline_object.run()
+        logger.info(f"{self.__stage_marker} {self.stage_name} completed {self.__stage_marker}\n{self.__separator}")
+
+
+def evaluate_models(model_evaluator) -> None:
+    """
+    Evaluates models on the whole data, or chunk by chunk in streaming mode.
+
+    :param model_evaluator: ModelEvaluator object.
+    """
+    model_evaluator.load_models()
+    if settings.streaming.enabled:
+        model_evaluator.save_regression_evaluation_streaming(settings.streaming.chunksize)
+    else:
+        model_evaluator.load_data_files()
+        model_evaluator.preprocess_data()
+        model_evaluator.save_regression_evaluation()
+
 
 class DataIngestionPipeline(Pipeline):
     """
     Pipeline that runs data ingestion process
     """
 
+    @staticmethod
+    def outputs():
+        # the logical path of the data file is kept even if extraction is disabled, so that stages reading it depend
+        # on ingestion; resolve_data_file maps it to the zip it is then read from
+        config = settings.data_ingestion
+        return [config.zipped_file, os.path.join(config.unzip_dir, config.data_file)]
+
+    @staticmethod
+    def config():
+        return {'data_ingestion': settings.data_ingestion}
+
+    @staticmethod
+    def outputs_valid():
+        # ingestion has no inputs, so its fingerprint does not notice a truncated or corrupted zip
+        from mlengine.data_read.read import DataIngestion
+
+        return DataIngestion(config=settings.data_ingestion).is_archive_valid()
+
     @staticmethod
     def run():
+        from mlengine.common.utils import create_directories
+        from mlengine.data_read.read import DataIngestion
+
         create_directories([settings.artifacts_root])
         data_ingestion = DataIngestion(config=settings.data_ingestion)
         data_ingestion.download_file()
@@ -70,8 +147,22 @@ class DataValidationPreTransformPipeline(Pipeline):
     Pipeline that runs data validation process
     """
 
+    @staticmethod
+    def inputs():
+        return settings.data_validation.req_files
+
+    @staticmethod
+    def outputs():
+        return [os.path.join(settings.data_validation.root_dir, settings.data_validation.status_file)]
+
+    @staticmethod
+    def config():
+        return {'data_validation': settings.data_validation}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator, StudentDataValidator
+
         file_validator = FileValidator(config=settings.data_validation)
         file_validator.validate_all_files_exist()
         data_validator = StudentDataValidator(config=settings.data_validation)
@@ -83,8 +174,23 @@ class DataTransformationPipeline(Pipeline):
     Pipeline that runs data transformation process
     """
 
+    @staticmethod
+    def inputs():
+        return settings.data_transformation.req_files
+
+    @staticmethod
+    def outputs():
+        return [os.path.join(settings.data_transformation.root_dir, settings.data_transformation.data_file_tnsf)]
+
+    @staticmethod
+    def config():
+        return {'data_transformation': settings.data_transformation}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator
+        from mlengine.dataops.transform import StudentDataTransformer
+
         file_validator = FileValidator(config=settings.data_transformation)
         file_validator.validate_all_files_exist()
         data_transformer = StudentDataTransformer(config=settings.data_transformation)
@@ -97,8 +203,22 @@ class DataValidationPostTransformPipeline(Pipeline):
     Pipeline that runs data transformation process
     """
 
+    @staticmethod
+    def inputs():
+        return settings.data_validation_post_t.req_files
+
+    @staticmethod
+    def outputs():
+        return [os.path.join(settings.data_validation_post_t.root_dir, settings.data_validation_post_t.status_file)]
+
+    @staticmethod
+    def config():
+        return {'data_validation_post_t': settings.data_validation_post_t}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator, StudentTransformedDataValidator
+
         file_validator = FileValidator(config=settings.data_validation_post_t)
         file_validator.validate_all_files_exist()
         data_validator = StudentTransformedDataValidator(config=settings.data_validation_post_t)
@@ -110,8 +230,23 @@ class DataSplitPipeline(Pipeline):
     Pipeline that runs dataset split process
     """
 
+    @staticmethod
+    def inputs():
+        return settings.data_split.req_files
+
+    @staticmethod
+    def outputs():
+        return [os.path.join(settings.data_split.root_dir, file) for file in settings.data_split.split_files]
+
+    @staticmethod
+    def config():
+        return {'data_split': settings.data_split, 'model': settings.model}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator
+        from mlengine.dataops.split import DataSplitter
+
         file_validator = FileValidator(config=settings.data_split)
         file_validator.validate_all_files_exist()
         data_splitter = DataSplitter(config=settings)
@@ -123,8 +258,23 @@ class ModelPreprocessingPipeline(Pipeline):
     Pipeline that runs data preprocessing (feature engineering)
     """
 
+    @staticmethod
+    def inputs():
+        return settings.model_preprocessing.req_files
+
+    @staticmethod
+    def outputs():
+        return [os.path.join(settings.model_preprocessing.root_dir, settings.model_preprocessing.prep_pipeline_file)]
+
+    @staticmethod
+    def config():
+        return {'model_preprocessing': settings.model_preprocessing, 'model': settings.model}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator
+        from mlengine.features.prep import Preprocessor
+
         file_validator = FileValidator(config=settings.model_preprocessing)
         file_validator.validate_all_files_exist()
         data_splitter = Preprocessor(config=settings.model_preprocessing)
@@ -139,19 +289,36 @@ class ModelTrainingPipeline(Pipeline):
     Pipeline that runs model training process
     """
 
+    @staticmethod
+    def inputs():
+        return settings.model_training.req_files + [settings.model_training.params_file]
+
+    @staticmethod
+    def outputs():
+        config = settings.model_training
+        return [config.models_dir, os.path.join(config.root_dir, config.metrics_file)]
+
+    @staticmethod
+    def config():
+        return {'model_training': settings.model_training, 'streaming': settings.streaming}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator
+        from mlengine.models.train import ModelTrainer
+        from mlengine.models.evaluate import ModelEvaluator
+
         file_validator = FileValidator(config=settings.model_training)
         file_validator.validate_all_files_exist()
         data_splitter = ModelTrainer(config=settings.model_training)
-        data_splitter.get_training_data()
-        data_splitter.preprocess_training_data()
-        data_splitter.train_models()
-        model_evaluator = ModelEvaluator(config=settings.model_training)
-        model_evaluator.load_models()
-        model_evaluator.load_data_files()
-        model_evaluator.preprocess_data()
-        model_evaluator.save_regression_evaluation()
+        data_splitter.clear_models_dir()
+        if settings.streaming.enabled:
+            data_splitter.train_models_streaming(settings.streaming.chunksize, settings.streaming.epochs)
+        else:
+            data_splitter.get_training_data()
+            data_splitter.preprocess_training_data()
+            data_splitter.train_models()
+        evaluate_models(ModelEvaluator(config=settings.model_training))
 
 
 class ModelValidationPipeline(Pipeline):
@@ -159,15 +326,26 @@ class ModelValidationPipeline(Pipeline):
     Pipeline that runs model training process
     """
 
+    @staticmethod
+    def inputs():
+        return settings.model_validation.req_files + [settings.model_validation.models_dir]
+
+    @staticmethod
+    def outputs():
+        return [os.path.join(settings.model_validation.root_dir, settings.model_validation.metrics_file)]
+
+    @staticmethod
+    def config():
+        return {'model_validation': settings.model_validation, 'streaming': settings.streaming}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator
+        from mlengine.models.evaluate import ModelEvaluator
+
         file_validator = FileValidator(config=settings.model_validation)
         file_validator.validate_all_files_exist()
-        model_evaluator = ModelEvaluator(config=settings.model_validation)
-        model_evaluator.load_models()
-        model_evaluator.load_data_files()
-        model_evaluator.preprocess_data()
-        model_evaluator.save_regression_evaluation()
+        evaluate_models(ModelEvaluator(config=settings.model_validation))
 
 
 class ModelTestingPipeline(Pipeline):
@@ -175,25 +353,42 @@ class ModelTestingPipeline(Pipeline):
     Pipeline that runs model testing process
     """
 
+    @staticmethod
+    def inputs():
+        # the picked model is published for serving, so it also waits for (the status files of) both data validations
+        return (settings.model_testing.req_files + [settings.model_testing.models_dir]
+                + DataValidationPreTransformPipeline.outputs() + DataValidationPostTransformPipeline.outputs())
+
+    @staticmethod
+    def outputs():
+        config = settings.model_testing
+        return [os.path.join(config.root_dir, file) for file in (config.metrics_file, settings.model_preprocessing.prep_pipeline_file, 'model.pkl')]
+
+    @staticmethod
+    def config():
+        # the linear table is exported regardless of prediction.linear_table, which only decides whether serving uses it
+        return {'model_testing': settings.model_testing, 'streaming': settings.streaming}
+
     @staticmethod
     def run():
+        from mlengine.dataops.validate import FileValidator
+        from mlengine.models.evaluate import ModelEvaluator
+        from mlengine.models.pick import ModelPicker
+
         file_validator = FileValidator(config=settings.model_testing)
         file_validator.validate_all_files_exist()
-        model_evaluator = ModelEvaluator(config=settings.model_testing)
-        model_evaluator.load_models()
-        model_evaluator.load_data_files()
-        model_evaluator.preprocess_data()
-        model_evaluator.save_regression_evaluation()
+        evaluate_models(ModelEvaluator(config=settings.model_testing))
         model_picker = ModelPicker(config=settings)
         model_picker.pick_best_model()
         model_picker.save_best_model()
 
 
-def run_pipeline(option: str) -> None:
+def get_pipeline(option: str) -> tuple[str, Pipeline]:
     """
-    Facade for running pipeline chosen by option parameter
+    Returns pipeline chosen by option parameter
 
-    :param option: str matched against a set of options to determine which pipeline to run
+    :param option: str matched against a set of options to determine which pipeline to return
+    :return: tuple of stage name and pipeline object
     """
     match option:
         case 'data_ingestion':
@@ -226,5 +421,120 @@ def run_pipeline(option: str) -> None:
         case other:
             raise ValueError(f'Incorrect option: {other}.')
 
-    runner = PipelineRunner(pipeline_object=pipeline, stage_name=stage_name)
+    return stage_name, pipeline
+
+
+def run_pipeline(option: str, force: bool = False) -> None:
+    """
+    Facade for running pipeline chosen by option parameter
+
+    :param option: str matched against a set of options to determine which pipeline to run
+    :param force: if True, pipeline is run even if its outputs are up to date
+    """
+    stage_name, pipeline = get_pipeline(option)
+    runner = PipelineRunner(pipeline_object=pipeline, stage_name=stage_name, force=force)
     runner.run_pipeline()
+
+
+class PipelineScheduler:
+    """
+    Runs pipelines as a dependency graph: a pipeline depends on every other pipeline producing one of its inputs
+    and is started (in a pool of worker threads) as soon as all of them completed, so independent pipelines run concurrently.
+    Pipelines depending (directly or not) on a failed one are not run.
+    """
+
+    def __init__(self, options: list[str], max_workers: int, force: bool = False):
+        self.pipelines = {option: get_pipeline(option) for option in options}
+        self.max_workers = max_workers
+        self.force = force
+        self.dependencies = self.build_graph()
+
+    def build_graph(self) -> dict[str, set]:
+        """
+        Builds dependency graph by matching inputs of each pipeline against outputs of the other ones.
+        Inputs not produced by any scheduled pipeline are expected to exist already.
+
+        :return: dict mapping option to set of options it depends on.
+        """
+        producers = {}
+        for option, (_, pipeline) in self.pipelines.items():
+            for output in pipeline.outputs():
+                producers[os.path.normpath(output)] = option
+
+        dependencies = {option: {producers[path] for path in map(os.path.normpath, pipeline.inputs()) if path in producers} - {option}
+                        for option, (_, pipeline) in self.pipelines.items()}
+
+        visited, visiting = set(), set()
+
+        def visit(option):
+            if option in visiting:
+                raise ValueError(f'Pipelines have a cyclic dependency involving: {option}.')
+            if option not in visited:
+                visiting.add(option)
+                for dependency in dependencies[option]:
+                    visit(dependency)
+                visiting.remove(option)
+                visited.add(option)
+
+        for option in dependencies:
+            visit(option)
+
+        return dependencies
+
+    def get_dependents(self, option: str) -> set:
+        """
+        :return: set of options depending directly or transitively on the given one.
+        """
+        dependents = {dependent for dependent, dependencies in self.dependencies.items() if option in dependencies}
+        for dependent in list(dependents):
+            dependents |= self.get_dependents(dependent)
+        return dependents
+
+    def run(self) -> None:
+        """
+        Runs all pipelines, starting each one once its dependencies completed.
+
+        :raises PipelineFailedException: if any pipeline failed (after all runnable pipelines finished).
+        """
+        pending, completed, failed, skipped = list(self.pipelines), set(), [], set()
+        running = {}
+
+        # stages hand their outputs over in memory, while the artifacts are written to disk in the background
+        store = artifact_store.run(settings.artifact_store.write_workers) if settings.artifact_store.enabled else nullcontext()
+        with store, ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pipeline') as executor:
+            while pending or running:
+                for option in [option for option in pending if self.dependencies[option] <= completed]:
+                    pending.remove(option)
+                    stage_name, pipeline = self.pipelines[option]
+                    runner = PipelineRunner(pipeline_object=pipeline, stage_name=stage_name, force=self.force)
+                    running[executor.submit(runner.run_pipeline)] = option
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    option = running.pop(future)
+                    if future.exception() is None:
+                        completed.add(option)
+                        continue
+
+                    failed.append(option)
+                    dependents = self.get_dependents(option) & set(pending)
+                    if dependents:
+                        logger.error(f"{self.pipelines[option][0]} failed, not running: {', '.join(self.pipelines[dependent][0] for dependent in dependents)}.")
+                    skipped |= dependents
+                    pending = [option for option in pending if option not in dependents]
+
+        if failed:
+            raise PipelineFailedException('PPL_EX_001', f"Pipelines failed: {', '.join(failed)}"
+                                          + (f"; not run: {', '.join(sorted(skipped))}." if skipped else "."))
+
+
+def run_pipelines(options: list[str], max_workers: int | None = None, force: bool = False) -> None:
+    """
+    Facade for running a set of pipelines concurrently, respecting dependencies between them
+
+    :param options: list of options of pipelines to run
+    :param max_workers: maximum number of pipelines running at the same time (scheduler settings by default)
+    :param force: if True, pipelines are run even if their outputs are up to date
+    """
+    scheduler = PipelineScheduler(options, max_workers=max_workers or settings.scheduler.max_workers, force=force)
+    scheduler.run()
@@ -0,0 +1,18 @@
+import os
+import sys
+import zipfile
+
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+
+@pytest.fixture(scope='session')
+def student_data() -> pd.DataFrame:
+    """
+    Student data shipped with the repository (stud.csv in stud.zip).
+    """
+    with zipfile.ZipFile(os.path.join(ROOT_DIR, 'stud.zip')) as archive, archive.open('stud.csv') as file:
+        return pd.read_csv(file)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from box import ConfigBox
+
+from mlengine.features.compiled import compile_preprocessing_pipeline
+from mlengine.features.prep import Preprocessor
+
+TARGET = 'math_score'
+
+
+def fit_preprocessing_pipeline(data: pd.DataFrame, method: str):
+    feature_selection = dict(method=method, estimator='svr', step=1, n_features=None, threshold='mean',
+                             score_func='f_regression', percentile=50, random_state=42)
+    preprocessor = Preprocessor(ConfigBox(dict(req_files=['X_train.csv', 'y_train.csv'], root_dir='.', prep_pipeline_file='pipeline.pkl',
+                                               feature_selection=feature_selection)))
+    preprocessor.X_train, preprocessor.y_train = data.drop(columns=TARGET), data[TARGET]
+    preprocessor.setup_preprocessing_pipeline()
+    preprocessor.fit_train_data()
+    return preprocessor.prep_pipeline
+
+
+@pytest.fixture(scope='module', params=['rfe', 'univariate', 'none'])
+def pipelines(request, student_data):
+    pipeline = fit_preprocessing_pipeline(student_data.iloc[:600], request.param)
+    return pipeline, compile_preprocessing_pipeline(pipeline, verify=False)
+
+
+@pytest.fixture(scope='module')
+def records(student_data) -> list:
+    """
+    Unseen records, with missing numerical and categorical values (imputed by both implementations).
+    """
+    records = student_data.iloc[600:700].drop(columns=TARGET).to_dict(orient='records')
+    records[0]['reading_score'] = float('nan')
+    records[1]['writing_score'] = float('nan')
+    records[2]['gender'] = float('nan')
+    records[3]['lunch'] = float('nan')
+    return records
+
+
+def sklearn_transform(pipeline, records) -> np.ndarray:
+    return np.asarray(pipeline.transform(pd.DataFrame(list(records))), dtype=np.float64)
+
+
+def test_parity_on_dicts(pipelines, records):
+    pipeline, compiled = pipelines
+    assert np.array_equal(compiled.transform(records), sklearn_transform(pipeline, records))
+
+
+def test_parity_on_single_dict(pipelines, records):
+    pipeline, compiled = pipelines
+    assert np.array_equal(compiled.transform(records[0]), sklearn_transform(pipeline, records[:1]))
+
+
+def test_parity_on_record_arrays(pipelines, records):
+    pipeline, compiled = pipelines
+    record_array = pd.DataFrame(records).to_records(index=False)
+    assert np.array_equal(compiled.transform(record_array), sklearn_transform(pipeline, records))
+
+
+def test_parity_on_probe_records(pipelines):
+    pipeline, compiled = pipelines
+    assert compiled.check_parity(pipeline, compiled.probe_records())
+
+
+@pytest.mark.parametrize('column', ['gender', 'parental_level_of_education'])
+def test_unknown_category_raises_like_sklearn(pipelines, records, column):
+    pipeline, compiled = pipelines
+    record = dict(records[10], **{column: 'unknown'})
+    with pytest.raises(ValueError, match='unknown categor'):
+        sklearn_transform(pipeline, [record])
+    with pytest.raises(ValueError, match=f'unknown category .* in column {column}'):
+        compiled.transform([record])
+
+
+@pytest.mark.parametrize('column', ['gender', 'lunch'])
+def test_pd_na_is_imputed_like_nan(pipelines, records, column):
+    pipeline, compiled = pipelines
+    with_na = [dict(record, **{column: pd.NA}) if i % 3 == 0 else record for i, record in enumerate(records)]
+    with_nan = [dict(record, **{column: float('nan')}) if i % 3 == 0 else record for i, record in enumerate(records)]
+    expected = sklearn_transform(pipeline, with_nan)
+
+    assert np.array_equal(compiled.transform(with_na), expected)
+    frame = pd.DataFrame(with_na).astype({column: 'string'})  # missing values of the string dtype are pd.NA
+    assert np.array_equal(compiled.transform(frame), expected)
+
+
+def test_pd_na_in_nullable_integer_column(pipelines, records):
+    pipeline, compiled = pipelines
+    frame = pd.DataFrame(records).astype({'reading_score': 'Int64'})
+    frame.loc[[4, 5], 'reading_score'] = pd.NA
+    assert np.array_equal(compiled.transform(frame), np.asarray(pipeline.transform(frame), dtype=np.float64))
@@ -0,0 +1,18 @@
+import pytest
+
+from mlengine.config.settings import settings
+from mlengine.pipelines.fingerprint import compute_fingerprint
+from mlengine.pipelines.pipeline import ModelTestingPipeline
+
+
+def set_prediction(monkeypatch, **update):
+    settings.artifacts_root  # settings are loaded on first access
+    monkeypatch.setattr(settings, '_settings', settings._settings.model_copy(
+        update={'prediction': settings.prediction.model_copy(update=update)}))
+
+
+@pytest.mark.parametrize('update', [{'linear_table': False}, {'compiled_preprocessor': False}, {'cache_size': 100}])
+def test_serving_settings_do_not_invalidate_model_testing(monkeypatch, update):
+    fingerprint = compute_fingerprint(ModelTestingPipeline())
+    set_prediction(monkeypatch, **update)
+    assert compute_fingerprint(ModelTestingPipeline()) == fingerprint
@@ -0,0 +1,56 @@
+import hashlib
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from mlengine.common.exceptions import MissingCriticalFileException
+from mlengine.models.holder import ModelHolder
+
+
+def publish(tmp_path, model, preprocessor) -> None:
+    """
+    Publishes model with its preprocessor, as the model testing stage does.
+    """
+    joblib.dump(preprocessor, tmp_path / 'preprocessing_pipeline.pkl')
+    model.preprocessor_sha256_ = hashlib.sha256((tmp_path / 'preprocessing_pipeline.pkl').read_bytes()).hexdigest()
+    joblib.dump(model, tmp_path / 'model.pkl')
+
+
+def make_holder(tmp_path) -> ModelHolder:
+    holder = object.__new__(ModelHolder)  # not the process-wide instance
+    ModelHolder.__init__(holder)
+    holder.model_path = str(tmp_path / 'model.pkl')
+    holder.preprocessor_path = str(tmp_path / 'preprocessing_pipeline.pkl')
+    holder.compile_preprocessor = holder.use_linear_table = False
+    return holder
+
+
+@pytest.fixture
+def fitted():
+    X = np.arange(20.0).reshape(10, 2)
+    return LinearRegression().fit(X, X.sum(axis=1)), StandardScaler().fit(X)
+
+
+def test_published_pair_is_loaded(tmp_path, fitted):
+    publish(tmp_path, *fitted)
+    artifacts = make_holder(tmp_path).get()
+    assert np.array_equal(artifacts.preprocessor.mean_, fitted[1].mean_)
+
+
+def test_preprocessor_not_published_with_model_is_refused(tmp_path, fitted):
+    model, preprocessor = fitted
+    publish(tmp_path, model, preprocessor)
+    holder = make_holder(tmp_path)
+    loaded = holder.get()
+
+    joblib.dump(StandardScaler().fit(np.ones((3, 2))), tmp_path / 'preprocessing_pipeline.pkl')
+    assert holder.refresh(force=True) is loaded  # the previous pair is kept
+    with pytest.raises(MissingCriticalFileException):
+        make_holder(tmp_path).get()
+
+    publish(tmp_path, model, StandardScaler().fit(np.ones((3, 2))))
+    assert holder.refresh().version != loaded.version
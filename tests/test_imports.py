@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR
+
+# seconds, generous for shared CI runners, can be tightened with the environment variable
+IMPORT_BUDGET = float(os.environ.get('MLENGINE_IMPORT_BUDGET', '1.5'))
+
+
+def run_python(code: str, cwd) -> subprocess.CompletedProcess:
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [os.path.join(ROOT_DIR, 'src'), os.environ.get('PYTHONPATH')]))}
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=cwd, env=env)
+
+
+def test_serving_import_within_budget(tmp_path):
+    result = subprocess.run([sys.executable, os.path.join(ROOT_DIR, 'benchmark.py'), '--mode', 'import', '--import-budget', str(IMPORT_BUDGET)],
+                            capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+@pytest.mark.parametrize('module', ['mlengine.models.predict', 'mlengine.pipelines.pipeline'])
+def test_import_does_not_load_heavy_dependencies(tmp_path, module):
+    result = run_python(f"import sys, {module}; print(','.join(m for m in ('sklearn', 'coloredlogs') if m in sys.modules))", tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+
+
+def test_import_does_not_write_logs(tmp_path):
+    result = run_python('import mlengine.models.predict, mlengine.pipelines.pipeline', tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert not os.path.exists(os.path.join(tmp_path, 'logs'))
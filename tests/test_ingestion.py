@@ -0,0 +1,154 @@
+import hashlib
+import http.server
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from box import ConfigBox
+
+from conftest import ROOT_DIR
+from mlengine.common.exceptions import DataIngestionException
+from mlengine.config.settings import settings
+from mlengine.data_read.read import DataIngestion, read_data_file, read_data_file_chunks, resolve_data_file
+from mlengine.pipelines.pipeline import DataIngestionPipeline, PipelineRunner, PipelineScheduler
+
+with open(os.path.join(ROOT_DIR, 'stud.zip'), 'rb') as file:
+    ARCHIVE = file.read()
+
+
+class ArchiveServer(http.server.ThreadingHTTPServer):
+    """
+    Serves the archive with range requests, closing the connection midway through the first response.
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ArchiveHandler)
+        self.requests = []
+        self.interrupt = True
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/stud.zip'
+
+
+class ArchiveHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        range_header = self.headers.get('Range')
+        self.server.requests.append(range_header)
+        start = int(range_header.removeprefix('bytes=').removesuffix('-')) if range_header else 0
+        body = ARCHIVE[start:]
+        self.send_response(206 if range_header else 200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.server.interrupt:
+            self.server.interrupt = False
+            body = body[:len(body) // 3]
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ArchiveServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def config(tmp_path, server) -> ConfigBox:
+    return ConfigBox(dict(root_dir=str(tmp_path), source_URL=server.url, zipped_file=str(tmp_path / 'stud.zip'), unzip_dir=tmp_path,
+                          data_file='stud.csv', sha256=hashlib.sha256(ARCHIVE).hexdigest(), chunk_size=4096, timeout=5, retries=2,
+                          extract=False))
+
+
+def set_data_ingestion(monkeypatch, **update):
+    """
+    Replaces data ingestion settings of the application for the duration of a test, for tests of pipelines,
+    which read them from the application settings.
+    """
+    settings.artifacts_root  # settings are loaded on first access
+    monkeypatch.setattr(settings, '_settings', settings._settings.model_copy(
+        update={'data_ingestion': settings.data_ingestion.model_copy(update=update)}))
+    return settings.data_ingestion
+
+
+def set_incremental(monkeypatch, fingerprints_dir):
+    """
+    Enables skipping of up-to-date pipelines, with fingerprints recorded in the given directory.
+    """
+    settings.artifacts_root  # settings are loaded on first access
+    monkeypatch.setattr(settings, '_settings', settings._settings.model_copy(
+        update={'incremental': settings.incremental.model_copy(update={'enabled': True, 'fingerprints_dir': fingerprints_dir})}))
+
+
+def test_interrupted_download_is_resumed(server, config):
+    DataIngestion(config).download_file()
+
+    with open(config.zipped_file, 'rb') as file:
+        assert file.read() == ARCHIVE
+    assert server.requests[0] is None and server.requests[1] == f'bytes={len(ARCHIVE) // 3}-'
+    assert not os.path.exists(f'{config.zipped_file}.part')
+
+
+def test_checksum_mismatch_is_rejected(server, config):
+    config.sha256 = '0' * 64
+    with pytest.raises(DataIngestionException) as error:
+        DataIngestion(config).download_file()
+
+    assert error.value.id == 'ING_EX_002'
+    assert not os.path.exists(config.zipped_file) and not os.path.exists(f'{config.zipped_file}.part')
+
+
+def test_data_file_is_read_from_archive_without_extraction(config, student_data):
+    ingestion = DataIngestion(config)
+    ingestion.download_file()
+    ingestion.extract_zip_file()
+
+    assert not os.path.exists(os.path.join(config.unzip_dir, config.data_file))
+    pd.testing.assert_frame_equal(read_data_file(config.zipped_file), student_data)
+    pd.testing.assert_frame_equal(pd.concat(read_data_file_chunks(config.zipped_file, chunksize=300)), student_data)
+
+
+def test_only_archive_member_is_extracted_as_data_file(config, student_data):
+    config.extract, config.data_file = True, 'students.csv'
+    ingestion = DataIngestion(config)
+    ingestion.download_file()
+    ingestion.extract_zip_file()
+
+    pd.testing.assert_frame_equal(read_data_file(os.path.join(config.unzip_dir, 'students.csv')), student_data)
+
+
+def test_stages_reading_data_file_depend_on_ingestion(monkeypatch):
+    ingestion_settings = set_data_ingestion(monkeypatch, extract=False)
+    data_file = os.path.join(ingestion_settings.unzip_dir, ingestion_settings.data_file)
+    assert resolve_data_file(data_file) == Path(ingestion_settings.zipped_file)
+
+    scheduler = PipelineScheduler(['data_ingestion', 'data_validation_pre_t', 'data_transformation'], max_workers=1)
+    assert 'data_ingestion' in scheduler.dependencies['data_validation_pre_t']
+    assert 'data_ingestion' in scheduler.dependencies['data_transformation']
+
+
+def test_corrupted_archive_is_not_skipped_as_up_to_date(monkeypatch, tmp_path, server, config):
+    # the pipeline runs with the application settings
+    ingestion_settings = set_data_ingestion(monkeypatch, **config.to_dict())
+    monkeypatch.chdir(tmp_path)
+    set_incremental(monkeypatch, tmp_path / 'fingerprints')
+    runner = PipelineRunner(DataIngestionPipeline(), 'Data Ingestion')
+    runner.run_pipeline()
+    requests = len(server.requests)
+
+    runner.run_pipeline()
+    assert len(server.requests) == requests  # skipped, the archive is valid
+
+    with open(ingestion_settings.zipped_file, 'r+b') as file:
+        file.truncate(len(ARCHIVE) // 2)
+    runner.run_pipeline()
+    with open(ingestion_settings.zipped_file, 'rb') as file:
+        assert file.read() == ARCHIVE
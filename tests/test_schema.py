@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from mlengine.dataops.validate import StudentDataValidator, StudentTransformedDataValidator
+
+
+@pytest.fixture
+def data(student_data) -> pd.DataFrame:
+    return student_data.iloc[:50].copy()
+
+
+def violations(schema, df) -> set:
+    return set(schema.validate(df).violations)
+
+
+def test_student_data_is_valid(data):
+    assert StudentDataValidator.schema.validate(data).valid
+    assert StudentTransformedDataValidator.schema.validate(data).valid
+
+
+def test_new_category_values_are_type_checked_only(data):
+    data.loc[0, 'race_ethnicity'] = 'group F'
+    data['gender'] = data['gender'].astype('category')
+    assert StudentDataValidator.schema.validate(data).valid
+
+    data['lunch'] = data['lunch'].astype(object)
+    data.loc[1, 'lunch'] = 1
+    assert violations(StudentDataValidator.schema, data) == {('lunch', 'dtype')}
+
+
+@pytest.mark.parametrize('column', ['math_score', 'reading_score'])
+def test_bools_are_rejected_as_ints(data, column):
+    data[column] = data[column] > 50
+    assert violations(StudentDataValidator.schema, data) == {(column, 'dtype')}
+
+    data[column] = data[column].astype(object)
+    data.loc[0, column] = 10
+    assert StudentDataValidator.schema.validate(data).violations[(column, 'dtype')].count == len(data) - 1
+
+
+def test_transformed_columns_are_validated_when_present(data):
+    data['total_score'] = data['math_score'] + data['reading_score'] + data['writing_score']
+    data['average'] = data['total_score'] / 3
+    assert StudentTransformedDataValidator.schema.validate(data).valid
+
+    data.loc[0, 'total_score'] = 301
+    data['average'] = data['average'] > 50
+    assert violations(StudentTransformedDataValidator.schema, data) == {('total_score', 'range'), ('average', 'dtype')}
+
+
+def test_downcast_columns_can_be_summed(data):
+    data.loc[0, ['math_score', 'reading_score', 'writing_score']] = 100
+    expected = data['math_score'] + data['reading_score'] + data['writing_score']
+
+    StudentDataValidator.schema.downcast(data)
+    assert data['math_score'].dtype == 'int16'
+    pd.testing.assert_series_equal(data['math_score'] + data['reading_score'] + data['writing_score'], expected, check_dtype=False)
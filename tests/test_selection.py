@@ -0,0 +1,31 @@
+import numpy as np
+import pydantic
+import pytest
+from box import ConfigBox
+
+from mlengine.config.settings import FeatureSelectionSettings
+from mlengine.features.selection import get_feature_selector
+
+FEATURE_SELECTION = dict(method='univariate', estimator='svr', step=1, n_features=3, threshold='mean',
+                         score_func='mutual_info_regression', percentile=50, random_state=42)
+
+
+def test_mutual_info_selection_is_reproducible():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 5, size=(300, 8)).astype(float)
+    y = X[:, 0] + X[:, 3] + rng.normal(size=300)
+
+    scores = [get_feature_selector(ConfigBox(FEATURE_SELECTION)).fit(X, y).scores_ for _ in range(2)]
+    assert np.array_equal(*scores)
+
+
+@pytest.mark.parametrize('step, expected', [(1, 1), (2.0, 2), (0.25, 0.25)])
+def test_step_is_features_or_fraction(step, expected):
+    settings = FeatureSelectionSettings(**{**FEATURE_SELECTION, 'step': step})
+    assert settings.step == expected and type(settings.step) is type(expected)
+
+
+@pytest.mark.parametrize('step', [0, 1.5, -1])
+def test_invalid_step_is_rejected(step):
+    with pytest.raises(pydantic.ValidationError):
+        FeatureSelectionSettings(**{**FEATURE_SELECTION, 'step': step})
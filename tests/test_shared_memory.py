@@ -0,0 +1,46 @@
+import os
+from functools import partial
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV
+
+from mlengine.common import utils
+from mlengine.common.utils import get_shared_array, get_shared_memory_dir
+
+
+def maps_file(estimator, X, y, path: str) -> float:
+    """
+    Scorer reporting whether the process scoring a fold has the file memory-mapped.
+    """
+    with open('/proc/self/maps') as maps:
+        return float(any(line.split()[-1] == path for line in maps if len(line.split()) == 6))
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason='memory maps are read from procfs')
+@pytest.mark.parametrize('n_jobs', [2, 4])
+def test_cv_workers_map_one_copy_of_training_data(tmp_path, n_jobs):
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(20000, 20)), rng.normal(size=20000)
+    path = str(tmp_path / 'X_train.npy')
+    X_shared = get_shared_array(X, path)
+
+    search = GridSearchCV(Ridge(), {'alpha': [0.1, 1.0, 10.0, 100.0]}, cv=2, n_jobs=n_jobs, scoring=partial(maps_file, path=path))
+    search.fit(X_shared, y)
+
+    # every fold is indexed out of the one shared file, no further copy of the whole matrix is made for the search;
+    # the folds themselves are copied by each worker, so this does not bound the workers' RSS
+    assert np.all(search.cv_results_['mean_test_score'] == 1.0)
+    assert sorted(os.listdir(tmp_path)) == ['X_train.npy']
+
+
+@pytest.mark.skipif(utils.SHARED_MEMORY_DIR is None, reason='no memory-backed file system')
+def test_shared_memory_dir_falls_back_to_disk(monkeypatch):
+    stats = os.statvfs(utils.SHARED_MEMORY_DIR)
+    free = stats.f_bavail * stats.f_frsize
+    assert get_shared_memory_dir(min(free // 2, 1024)) == utils.SHARED_MEMORY_DIR
+    assert get_shared_memory_dir(free + 1) is None
+
+    monkeypatch.setattr(utils, 'SHARED_MEMORY_DIR', None)
+    assert get_shared_memory_dir(1) is None